@@ -0,0 +1,122 @@
+"""Замер памяти и времени на пути экспорта: get_all_expenses -> create_expenses_excel.
+
+Сравнивает прежнюю выборку строк-словарей (RealDictCursor) с компактными строками
+ExpenseRecord из Database.get_all_expenses. Excel-файл в обоих случаях строится
+одной и той же create_expenses_excel. Нужна настроенная БД (config.DB_CONFIG).
+
+С --seed N во временной транзакции создается группа с N синтетическими расходами;
+в конце транзакция откатывается, в базе ничего не остается.
+
+    python scripts/measure_export_memory.py --seed 100000
+    python scripts/measure_export_memory.py --tenant 1
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from psycopg2.extras import RealDictCursor
+
+from database import db
+from excel_utils import create_expenses_excel, cleanup_excel_file
+from models import ExpenseRecord
+
+# Запрос get_all_expenses в том виде, в каком он выполнялся через RealDictCursor
+LEGACY_EXPORT_QUERY = """
+    SELECT
+        u.first_name,
+        u.username,
+        e.amount,
+        e.category,
+        e.description,
+        e.comment,
+        e.created_at
+    FROM expenses e
+    JOIN users u ON e.user_id = u.id
+    WHERE e.tenant_id = %s
+    ORDER BY e.created_at DESC
+"""
+
+def seed(count: int) -> int:
+    """Создает группу, пользователя и count расходов без коммита; возвращает id группы"""
+    with db.connection.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO tenants (name, invite_code)
+            VALUES ('measure', SUBSTRING(MD5(RANDOM()::text) FOR 8))
+            RETURNING id
+        """)
+        tenant_id = cursor.fetchone()[0]
+        cursor.execute("""
+            INSERT INTO users (telegram_id, username, first_name, tenant_id)
+            VALUES (-1, 'measure', 'Measure', %s)
+            RETURNING id
+        """, (tenant_id,))
+        user_id = cursor.fetchone()[0]
+        cursor.execute("""
+            INSERT INTO expenses (user_id, tenant_id, amount, category, description, comment, created_at)
+            SELECT %s, %s,
+                   (RANDOM() * 100000)::numeric(10, 2),
+                   (ARRAY['entertainment', 'food', 'snacks', 'home', 'other'])[1 + i %% 5],
+                   'Синтетический расход ' || i,
+                   CASE WHEN i %% 2 = 0 THEN 'комментарий ' || i END,
+                   NOW() - (i || ' minutes')::interval
+            FROM generate_series(1, %s) AS i
+        """, (user_id, tenant_id, count))
+    return tenant_id
+
+def legacy_rows(tenant_id: int):
+    with db.connection.cursor(cursor_factory=RealDictCursor) as cursor:
+        cursor.execute(LEGACY_EXPORT_QUERY, (tenant_id,))
+        return cursor.fetchall()
+
+def legacy_export(tenant_id: int):
+    rows = legacy_rows(tenant_id)
+    # Кортеж на строку создается и сразу отбрасывается, пиковую память держат словари
+    return create_expenses_excel(ExpenseRecord(**row) for row in rows)
+
+def compact_export(tenant_id: int):
+    return create_expenses_excel(db.get_all_expenses(tenant_id))
+
+def measure(label: str, func, tenant_id: int):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func(tenant_id)
+    elapsed = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    if isinstance(result, str):
+        cleanup_excel_file(result)
+        rows = None
+    else:
+        rows = len(result)
+    del result
+
+    suffix = f", {peak / rows:.0f} B/row" if rows else ""
+    print(f"{label:<28} peak {peak / 1e6:8.1f} MB, {elapsed * 1000:8.0f} ms{suffix}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--seed', type=int, help="создать N синтетических расходов (с откатом)")
+    group.add_argument('--tenant', type=int, help="замерить на данных существующей группы")
+    args = parser.parse_args()
+
+    db.connection  # подключение и проверка схемы до начала транзакции замера
+    tenant_id = seed(args.seed) if args.seed else args.tenant
+    try:
+        measure("rows: RealDictCursor", legacy_rows, tenant_id)
+        measure("rows: ExpenseRecord", db.get_all_expenses, tenant_id)
+        measure("export: RealDictCursor", legacy_export, tenant_id)
+        measure("export: ExpenseRecord", compact_export, tenant_id)
+    finally:
+        db.connection.rollback()
+        db.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+import calendar
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional, Tuple
+
+import numpy as np
+
+from database import db
+from config import CATEGORIES
+from models import Category
+from reports import format_amount
+
+CATEGORY_KEYS = [category.value for category in Category]
+CATEGORY_INDEX = {key: i for i, key in enumerate(CATEGORY_KEYS)}
+ROLLING_WINDOW = 7
+MAX_CACHED_ANALYTICS = 256
+
+@dataclass
+class SpendingSeries:
+    """Дневные расходы по категориям в колоночном виде: строки — дни, столбцы — категории"""
+    start: date
+    values: np.ndarray
+
+    @property
+    def daily_totals(self) -> np.ndarray:
+        return self.values.sum(axis=1)
+
+@dataclass
+class SpendingAnalytics:
+    today: date
+    rolling_average: float
+    week_total: float
+    prev_week_total: float
+    month_total: float
+    month_daily: np.ndarray
+    prev_month_same_period: float
+    month_by_category: np.ndarray
+    prev_month_by_category: np.ndarray
+    share_change: np.ndarray
+    projection: float
+
+# Кэш по (telegram_id, tenant_id): версия данных, дата, результат
+_cache: "OrderedDict[Tuple[Optional[int], Optional[int]], Tuple[int, date, SpendingAnalytics]]" = OrderedDict()
+
+def _remember(key, value):
+    _cache[key] = value
+    _cache.move_to_end(key)
+    while len(_cache) > MAX_CACHED_ANALYTICS:
+        _cache.popitem(last=False)
+
+def series_start(today: date) -> date:
+    """Первый день прошлого месяца — начало загружаемого ряда"""
+    if today.month == 1:
+        return date(today.year - 1, 12, 1)
+    return date(today.year, today.month - 1, 1)
+
+def load_series(telegram_id: int = None, tenant_id: int = None, today: date = None) -> SpendingSeries:
+    """Загружает дневной ряд пользователя или группы одним запросом в массив NumPy"""
+    today = today or date.today()
+    start = series_start(today)
+    values = np.zeros(((today - start).days + 1, len(CATEGORY_KEYS)))
+
+    columns = db.get_daily_category_series_columns(telegram_id, tenant_id)
+    if columns.days.size:
+        day_idx = (columns.days - np.datetime64(start, 'D')).astype(np.int64)
+        cat_idx = np.fromiter(
+            (CATEGORY_INDEX.get(category, -1) for category in columns.categories),
+            dtype=np.int64, count=columns.categories.size
+        )
+        mask = (day_idx >= 0) & (day_idx < values.shape[0]) & (cat_idx >= 0)
+        np.add.at(values, (day_idx[mask], cat_idx[mask]), columns.amounts[mask])
+
+    return SpendingSeries(start=start, values=values)
+
+def _shares(totals: np.ndarray) -> np.ndarray:
+    total = totals.sum()
+    if total <= 0:
+        return np.zeros_like(totals)
+    return totals / total
+
+def compute_analytics(series: SpendingSeries, today: date) -> SpendingAnalytics:
+    """Считает скользящее среднее, изменения за неделю и месяц, доли категорий и прогноз"""
+    values = series.values
+    daily = series.daily_totals
+
+    # Скользящее среднее за последние 7 дней
+    window = np.ones(ROLLING_WINDOW) / ROLLING_WINDOW
+    rolling = np.convolve(daily, window, mode='valid')
+    rolling_average = float(rolling[-1]) if rolling.size else float(daily.mean())
+
+    # Неделя к неделе: последние 7 дней против предыдущих 7
+    week_total = float(daily[-ROLLING_WINDOW:].sum())
+    prev_week_total = float(daily[-2 * ROLLING_WINDOW:-ROLLING_WINDOW].sum())
+
+    # Месяц к месяцу: текущий месяц против того же числа дней прошлого месяца
+    month_start_idx = (today.replace(day=1) - series.start).days
+    month_by_category = values[month_start_idx:].sum(axis=0)
+    month_daily = daily[month_start_idx:]
+    prev_month = values[:month_start_idx]
+    prev_month_same_period = float(prev_month[:today.day].sum())
+    prev_month_by_category = prev_month.sum(axis=0)
+
+    share_change = _shares(month_by_category) - _shares(prev_month_by_category)
+
+    # Прогноз на конец месяца по среднему дневному расходу текущего месяца
+    month_total = float(month_by_category.sum())
+    days_in_month = calendar.monthrange(today.year, today.month)[1]
+    projection = month_total / today.day * days_in_month
+
+    return SpendingAnalytics(
+        today=today,
+        rolling_average=rolling_average,
+        week_total=week_total,
+        prev_week_total=prev_week_total,
+        month_total=month_total,
+        month_daily=month_daily,
+        prev_month_same_period=prev_month_same_period,
+        month_by_category=month_by_category,
+        prev_month_by_category=prev_month_by_category,
+        share_change=share_change,
+        projection=projection,
+    )
+
+def get_analytics(telegram_id: int = None, tenant_id: int = None) -> SpendingAnalytics:
+    """Возвращает аналитику пользователя или группы из кэша, пересчитывая её только при изменении ряда"""
+    today = date.today()
+    key = (telegram_id, tenant_id)
+    version = db.data_version(telegram_id, tenant_id)
+    cached = _cache.get(key)
+    if cached and cached[0] == version and cached[1] == today:
+        _cache.move_to_end(key)
+        return cached[2]
+
+    result = compute_analytics(load_series(telegram_id, tenant_id, today), today)
+    _remember(key, (version, today, result))
+    return result
+
+def _format_delta(current: float, previous: float) -> str:
+    if previous <= 0:
+        return "—"
+    percent = (current - previous) / previous * 100
+    sign = "+" if percent >= 0 else ""
+    return f"{sign}{percent:.0f}%"
+
+def format_analytics(analytics: SpendingAnalytics, title: str) -> str:
+    response = f"{title}\n\n"
+    response += f"📆 Среднее за день (7 дней): {format_amount(analytics.rolling_average)} сум\n"
+    response += (
+        f"📊 Последние 7 дней: {format_amount(analytics.week_total)} сум "
+        f"({_format_delta(analytics.week_total, analytics.prev_week_total)} к прошлым 7 дням)\n"
+    )
+    response += (
+        f"🗓 С начала месяца: {format_amount(analytics.month_total)} сум "
+        f"({_format_delta(analytics.month_total, analytics.prev_month_same_period)} к прошлому месяцу)\n"
+    )
+    response += f"🔮 Прогноз на конец месяца: {format_amount(analytics.projection)} сум\n"
+
+    if analytics.month_total > 0:
+        response += "\nДоли категорий в этом месяце:\n"
+        shares = _shares(analytics.month_by_category)
+        for i in np.argsort(-analytics.month_by_category):
+            if analytics.month_by_category[i] <= 0:
+                continue
+            category_name = CATEGORIES.get(CATEGORY_KEYS[i], CATEGORY_KEYS[i])
+            change = analytics.share_change[i] * 100
+            sign = "+" if change >= 0 else ""
+            response += f"{category_name}: {shares[i] * 100:.0f}% ({sign}{change:.0f} п.п.)\n"
+
+    return response
@@ -0,0 +1,121 @@
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from database import db
+from config import CATEGORIES
+from models import Category
+
+PERIODS = {
+    'week': 'неделю',
+    'month': 'месяц',
+}
+WARNING_THRESHOLD = 0.8
+
+def period_start(period: str, day: date = None) -> date:
+    """Начало недели (понедельник) или месяца, как DATE_TRUNC в PostgreSQL"""
+    day = day or date.today()
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+@dataclass
+class BudgetState:
+    limit: float
+    period_start: date
+    spent: float
+
+class BudgetTracker:
+    """Держит в памяти лимиты и накопленные суммы по (пользователь, категория, период)"""
+
+    def __init__(self):
+        self._states: Dict[int, Dict[Tuple[str, str], BudgetState]] = {}
+
+    def _load(self, telegram_id: int) -> Dict[Tuple[str, str], BudgetState]:
+        states = self._states.get(telegram_id)
+        if states is None:
+            states = {
+                (row.category, row.period): BudgetState(
+                    limit=float(row.amount),
+                    period_start=row.period_start,
+                    spent=float(row.spent)
+                )
+                for row in db.get_budgets(telegram_id)
+            }
+            self._states[telegram_id] = states
+        return states
+
+    def get_states(self, telegram_id: int) -> Dict[Tuple[str, str], BudgetState]:
+        states = self._load(telegram_id)
+        for (_, period), state in states.items():
+            self._roll_period(state, period, date.today())
+        return states
+
+    def set_budget(self, telegram_id: int, category: Category, period: str, amount: float) -> Optional[BudgetState]:
+        total = db.set_budget(telegram_id, category, period, amount)
+        if total is None:
+            return None
+
+        state = BudgetState(limit=amount, period_start=total.period_start, spent=float(total.spent))
+        self._load(telegram_id)[(category.value, period)] = state
+        return state
+
+    def remove_budget(self, telegram_id: int, category: Category, period: str) -> bool:
+        if not db.delete_budget(telegram_id, category, period):
+            return False
+        self._load(telegram_id).pop((category.value, period), None)
+        return True
+
+    def forget(self, telegram_id: int):
+        """Сбрасывает состояние пользователя, чтобы перечитать его из БД"""
+        self._states.pop(telegram_id, None)
+
+    @staticmethod
+    def _roll_period(state: BudgetState, period: str, day: date):
+        start = period_start(period, day)
+        if state.period_start != start:
+            state.period_start = start
+            state.spent = 0.0
+
+    def record(self, telegram_id: int, category: str, amount: float, day: date = None) -> List[str]:
+        """Учитывает новый расход и возвращает предупреждения о пересечённых порогах"""
+        day = day or date.today()
+        # Если состояние загружается только сейчас, сумма из БД уже включает этот расход
+        already_counted = telegram_id not in self._states
+        states = self._load(telegram_id)
+        alerts = []
+        for period in PERIODS:
+            state = states.get((category, period))
+            if state is None:
+                continue
+
+            if period_start(period, day) < state.period_start:
+                # Расход за прошедший период не влияет на текущий бюджет
+                continue
+
+            self._roll_period(state, period, day)
+            if already_counted:
+                before = state.spent - amount
+            else:
+                before = state.spent
+                state.spent += amount
+            alert = self._threshold_alert(category, period, state, before)
+            if alert:
+                alerts.append(alert)
+        return alerts
+
+    @staticmethod
+    def _threshold_alert(category: str, period: str, state: BudgetState, before: float) -> Optional[str]:
+        if state.limit <= 0:
+            return None
+
+        category_name = CATEGORIES.get(category, category)
+        if before <= state.limit < state.spent:
+            return f"🚨 Бюджет «{category_name}» на {PERIODS[period]} превышен!"
+        if before < state.limit * WARNING_THRESHOLD <= state.spent <= state.limit:
+            percent = state.spent / state.limit * 100
+            return f"⚠️ Использовано {percent:.0f}% бюджета «{category_name}» на {PERIODS[period]}"
+        return None
+
+# Глобальный трекер бюджетов
+budget_tracker = BudgetTracker()
@@ -0,0 +1,120 @@
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+from aiogram import types
+from aiogram.types import BufferedInputFile
+
+MAX_CACHED_CHARTS = 128
+
+_executor: Optional[ProcessPoolExecutor] = None
+# Кэш по хэшу данных: готовые PNG и file_id, полученные от Telegram
+_images: "OrderedDict[str, bytes]" = OrderedDict()
+_file_ids: "OrderedDict[str, str]" = OrderedDict()
+
+def _plain_label(label: str) -> str:
+    """Убирает эмодзи, которых нет в шрифтах matplotlib"""
+    return ''.join(ch for ch in label if ord(ch) < 0x2000).strip()
+
+def _figure_to_png(fig) -> bytes:
+    import io
+    import matplotlib.pyplot as plt
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=120, bbox_inches='tight')
+    plt.close(fig)
+    return buffer.getvalue()
+
+def render_pie(title: str, labels: List[str], values: List[float]) -> bytes:
+    """Круговая диаграмма расходов по категориям (выполняется в процессе пула)"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(6, 6))
+    ax.pie(values, labels=[_plain_label(label) for label in labels], autopct='%1.0f%%', startangle=90)
+    ax.set_title(title)
+    ax.axis('equal')
+    return _figure_to_png(fig)
+
+def render_daily_line(title: str, days: List[int], values: List[float]) -> bytes:
+    """Линия дневных расходов за месяц (выполняется в процессе пула)"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(8, 4))
+    ax.plot(days, values, marker='o')
+    ax.fill_between(days, values, alpha=0.2)
+    ax.set_title(title)
+    ax.set_xlabel('День месяца')
+    ax.set_xticks(days)
+    ax.grid(True, alpha=0.3)
+    return _figure_to_png(fig)
+
+RENDERERS = {
+    'pie': render_pie,
+    'daily_line': render_daily_line,
+}
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: к этому моменту в процессе бота уже есть потоки и открытый сокет libpq,
+        # fork такого процесса может зависнуть на захваченной блокировке
+        _executor = ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('spawn'))
+    return _executor
+
+def shutdown():
+    """Останавливает пул процессов рендеринга"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+def chart_key(kind: str, *args) -> str:
+    """Хэш от типа графика и агрегированных данных, по которым он строится"""
+    payload = json.dumps([kind, *args], ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def _remember(cache: OrderedDict, key: str, value):
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > MAX_CACHED_CHARTS:
+        cache.popitem(last=False)
+
+async def render_chart(kind: str, *args) -> bytes:
+    """Возвращает PNG из кэша или рендерит его в пуле процессов"""
+    key = chart_key(kind, *args)
+    if key in _images:
+        _images.move_to_end(key)
+        return _images[key]
+
+    loop = asyncio.get_running_loop()
+    image = await loop.run_in_executor(_get_executor(), RENDERERS[kind], *args)
+    _remember(_images, key, image)
+    return image
+
+async def send_chart(message: types.Message, kind: str, *args, caption: str = None):
+    """Отправляет график, повторно используя file_id или готовый файл"""
+    key = chart_key(kind, *args)
+    try:
+        file_id = _file_ids.get(key)
+        if file_id:
+            await message.answer_photo(photo=file_id, caption=caption)
+            return
+
+        image = await render_chart(kind, *args)
+        sent = await message.answer_photo(
+            photo=BufferedInputFile(file=image, filename=f"{kind}.png"),
+            caption=caption
+        )
+        if sent.photo:
+            _remember(_file_ids, key, sent.photo[-1].file_id)
+    except Exception as e:
+        logging.error(f"Error sending chart {kind}: {e}")
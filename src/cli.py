@@ -0,0 +1,191 @@
+"""Отчеты и экспорт из командной строки, без запуска бота.
+
+Примеры:
+    python cli.py stats --period week --tenant 1
+    python cli.py stats --period all --per-user --parallel 4 -o report.txt
+    python cli.py by-date 2024-01-15 --user 123456789
+    python cli.py export --format csv --from 2024-01-01 --to 2024-01-31 -o january.csv
+"""
+import argparse
+import logging
+import multiprocessing
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+
+from database import db
+from models import Member
+from reports import (
+    format_category_totals, format_general_statistics, format_expenses_by_date, write_expenses_csv
+)
+
+PERIOD_TITLES = {
+    'week': ("📈 Статистика расходов за текущую неделю", "Итого за неделю", "Общая сумма за неделю"),
+    'month': ("🗓 Статистика расходов за текущий месяц", "Итого за месяц", "Общая сумма за месяц"),
+    'all': ("🏆 Статистика расходов за всё время", "Общий итог", "Общая сумма всех расходов"),
+}
+
+def valid_date(value: str) -> str:
+    try:
+        datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"неверная дата {value!r}, ожидается ГГГГ-ММ-ДД")
+    return value
+
+def period_range(period: str, date_from: str = None, date_to: str = None):
+    """Границы периода; если задан --from или --to, период не применяется, а недостающая граница открыта"""
+    if date_from is not None or date_to is not None:
+        return date_from, date_to
+
+    today = date.today()
+    if period == 'week':
+        date_from = (today - timedelta(days=today.weekday())).isoformat()
+    elif period == 'month':
+        date_from = today.replace(day=1).isoformat()
+    return date_from, date_to
+
+def report_titles(period: str, date_from: str, date_to: str, explicit_range: bool):
+    """Заголовок и подписи итогов; при явных --from/--to показывается фактический интервал"""
+    if not explicit_range:
+        return PERIOD_TITLES[period]
+
+    bounds = []
+    if date_from:
+        bounds.append(f"с {date_from}")
+    if date_to:
+        bounds.append(f"по {date_to}")
+    return (f"📊 Статистика расходов {' '.join(bounds)}", "Итого за период", "Общая сумма за период")
+
+def build_user_report(member: Member, titles, tenant_id: int, date_from: str, date_to: str) -> str:
+    """Отчет одного пользователя; выполняется и в отдельных процессах при --parallel"""
+    title, total_label, _ = titles
+    expenses = db.get_statistics([member.telegram_id], tenant_id, date_from, date_to)
+    if not expenses:
+        return f"{title} — {member.first_name}:\n\nНет расходов 📊"
+    return format_category_totals(f"{title} — {member.first_name}:", expenses, total_label)
+
+def open_output(path: str):
+    if path == '-':
+        return sys.stdout
+    return open(path, 'w', encoding='utf-8', newline='')
+
+def run_stats(args) -> int:
+    date_from, date_to = period_range(args.period, args.date_from, args.date_to)
+    explicit_range = args.date_from is not None or args.date_to is not None
+    titles = report_titles(args.period, date_from, date_to, explicit_range)
+
+    if not args.per_user:
+        title, _, grand_total_label = titles
+        expenses = db.get_statistics(args.user, args.tenant, date_from, date_to)
+        if not expenses:
+            print("Нет данных о расходах 📊", file=sys.stderr)
+            return 1
+        reports = [format_general_statistics(f"{title}:", expenses, grand_total_label)]
+    else:
+        members = db.get_members(args.tenant, args.user)
+        if not members:
+            print("Пользователи не найдены", file=sys.stderr)
+            return 1
+
+        if args.parallel > 1:
+            # spawn: каждый процесс открывает собственное подключение к БД.
+            # Открытая транзакция чтения родителя заблокировала бы миграцию схемы в дочерних процессах
+            db.close()
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=args.parallel, mp_context=context) as executor:
+                reports = list(executor.map(
+                    build_user_report,
+                    members,
+                    [titles] * len(members),
+                    [args.tenant] * len(members),
+                    [date_from] * len(members),
+                    [date_to] * len(members)
+                ))
+        else:
+            reports = [
+                build_user_report(member, titles, args.tenant, date_from, date_to) for member in members
+            ]
+
+    output = open_output(args.output)
+    try:
+        output.write("\n\n".join(reports) + "\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+def run_by_date(args) -> int:
+    expenses = db.get_expenses_by_date(args.user, args.date)
+    if not expenses:
+        print(f"📊 Нет расходов за {args.date}", file=sys.stderr)
+        return 1
+    print(format_expenses_by_date(args.date, expenses))
+    return 0
+
+def run_export(args) -> int:
+    expenses = db.get_expenses(args.user, args.tenant, args.date_from, args.date_to)
+    if not expenses:
+        print("Нет данных о расходах для экспорта 📊", file=sys.stderr)
+        return 1
+
+    if args.format == 'csv':
+        output = open_output(args.output)
+        try:
+            write_expenses_csv(expenses, output)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+    else:
+        if args.output == '-':
+            print("Для Excel укажите файл: -o report.xlsx", file=sys.stderr)
+            return 2
+        from excel_utils import create_expenses_excel
+        shutil.move(create_expenses_excel(expenses), args.output)
+
+    print(f"Экспортировано записей: {len(expenses)}", file=sys.stderr)
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Отчеты и экспорт расходов без запуска бота")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    filters = argparse.ArgumentParser(add_help=False)
+    filters.add_argument('--from', dest='date_from', type=valid_date, help="начальная дата ГГГГ-ММ-ДД")
+    filters.add_argument('--to', dest='date_to', type=valid_date, help="конечная дата ГГГГ-ММ-ДД (включительно)")
+    filters.add_argument('--tenant', type=int, help="id группы (домохозяйства)")
+    filters.add_argument('-o', '--output', default='-', help="файл для записи, '-' — stdout")
+
+    stats = subparsers.add_parser('stats', parents=[filters], help="статистика по категориям")
+    stats.add_argument('--period', choices=PERIOD_TITLES, default='week',
+                       help="период отчета (не применяется, если задан --from или --to)")
+    stats.add_argument('--user', type=int, action='append', help="telegram id (можно несколько раз)")
+    stats.add_argument('--per-user', action='store_true', help="отдельный отчет для каждого пользователя")
+    stats.add_argument('--parallel', type=int, default=1, metavar='N',
+                       help="строить отчеты пользователей в N процессах (подразумевает --per-user)")
+    stats.set_defaults(handler=run_stats)
+
+    by_date = subparsers.add_parser('by-date', help="расходы пользователя за день")
+    by_date.add_argument('date', type=valid_date)
+    by_date.add_argument('--user', type=int, required=True, help="telegram id")
+    by_date.set_defaults(handler=run_by_date)
+
+    export = subparsers.add_parser('export', parents=[filters], help="экспорт расходов в Excel или CSV")
+    export.add_argument('--format', choices=['xlsx', 'csv'], default='csv')
+    export.add_argument('--user', type=int, help="telegram id")
+    export.set_defaults(handler=run_export)
+
+    return parser
+
+def main(argv=None) -> int:
+    logging.basicConfig(level=logging.WARNING)
+    args = build_parser().parse_args(argv)
+    if getattr(args, 'parallel', 1) > 1:
+        args.per_user = True
+    try:
+        return args.handler(args)
+    finally:
+        db.close()
+
+if __name__ == '__main__':
+    sys.exit(main())
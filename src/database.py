@@ -1,22 +1,57 @@
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from config import DB_CONFIG
-from models import Category
+from psycopg2.extras import execute_values
+from config import DB_CONFIG, ALLOWED_USERS
+from models import (
+    Category, CategoryTotal, UserCategoryTotal, ExpenseRecord, DatedExpense,
+    DailySeriesColumns, SearchResult, BudgetRow, BudgetTotal,
+    RecurringExpense, MaterializedExpense, Tenant, Member
+)
+from typing import Dict, Optional, Tuple
+import asyncio
 import time
 import logging
 
+# Увеличивается при каждом изменении схемы в init_db
+SCHEMA_VERSION = 6
+# Версия, в которой появились группы: перенос пользователей без группы выполняется только при переходе на неё
+TENANTS_SCHEMA_VERSION = 5
+
 class Database:
     def __init__(self):
-        self.connection = None
+        self._connection = None
         self.max_retries = 3
         self.retry_delay = 2
-        self.connect()
-        self.init_db()
+        # Версии данных по ключам (telegram_id, None) и (None, tenant_id), растут при каждой записи расходов
+        self.data_versions: Dict[Tuple[Optional[int], Optional[int]], int] = {}
+
+    @property
+    def connection(self):
+        """Подключается при первом обращении, если open() еще не вызывался"""
+        if self._connection is None or self._connection.closed:
+            self.connect()
+            self.init_db()
+        return self._connection
+
+    async def open(self):
+        """Подключается и проверяет схему в отдельном потоке, не блокируя event loop"""
+        await asyncio.to_thread(lambda: self.connection)
+
+    def close(self):
+        if self._connection is not None and not self._connection.closed:
+            self._connection.close()
+        self._connection = None
+
+    def data_version(self, telegram_id: int = None, tenant_id: int = None) -> int:
+        return self.data_versions.get((telegram_id, tenant_id), 0)
+
+    def bump_data_version(self, telegram_id: int, tenant_id: Optional[int]):
+        for key in ((telegram_id, None), (None, tenant_id)):
+            self.data_versions[key] = self.data_versions.get(key, 0) + 1
 
     def connect(self):
         for attempt in range(self.max_retries):
             try:
-                self.connection = psycopg2.connect(**DB_CONFIG)
+                self._connection = psycopg2.connect(**DB_CONFIG)
                 logging.info("Connected to PostgreSQL database successfully!")
                 logging.info(f"Database: {DB_CONFIG.get('dbname')}")
                 logging.info(f"Host: {DB_CONFIG.get('host')}")
@@ -29,9 +64,23 @@ class Database:
                     logging.info("Failed to connect to PostgreSQL after multiple attempts")
                     raise e
 
+    def get_schema_version(self) -> int:
+        try:
+            with self._connection.cursor() as cursor:
+                cursor.execute("SELECT MAX(version) FROM schema_version")
+                return cursor.fetchone()[0] or 0
+        except psycopg2.Error:
+            self._connection.rollback()
+            return 0
+
     def init_db(self):
+        previous_version = self.get_schema_version()
+        if previous_version == SCHEMA_VERSION:
+            logging.info(f"Database schema is up to date (version {SCHEMA_VERSION})")
+            return
+
         try:
-            with self.connection.cursor() as cursor:
+            with self._connection.cursor() as cursor:
                 # Таблица пользователей
                 cursor.execute("""
                     CREATE TABLE IF NOT EXISTS users (
@@ -57,10 +106,235 @@ class Database:
                     )
                 """)
 
-                self.connection.commit()
+                # Бюджеты по категориям
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS budgets (
+                        id SERIAL PRIMARY KEY,
+                        user_id INTEGER REFERENCES users(id),
+                        category VARCHAR(20) NOT NULL,
+                        period VARCHAR(10) NOT NULL,
+                        amount DECIMAL(10, 2) NOT NULL,
+                        UNIQUE (user_id, category, period)
+                    )
+                """)
+
+                # Накопленные суммы по бюджетам за период (обновляются при каждой записи)
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS budget_totals (
+                        user_id INTEGER REFERENCES users(id),
+                        category VARCHAR(20) NOT NULL,
+                        period VARCHAR(10) NOT NULL,
+                        period_start DATE NOT NULL,
+                        spent DECIMAL(12, 2) NOT NULL DEFAULT 0,
+                        PRIMARY KEY (user_id, category, period, period_start)
+                    )
+                """)
+
+                # Шаблоны регулярных расходов (аренда, подписки, коммунальные)
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS recurring_expenses (
+                        id SERIAL PRIMARY KEY,
+                        user_id INTEGER REFERENCES users(id),
+                        amount DECIMAL(10, 2) NOT NULL,
+                        category VARCHAR(20) NOT NULL,
+                        description TEXT NOT NULL,
+                        schedule VARCHAR(10) NOT NULL,
+                        day_of_period SMALLINT NOT NULL DEFAULT 1,
+                        start_date DATE NOT NULL DEFAULT CURRENT_DATE,
+                        last_materialized DATE,
+                        active BOOLEAN NOT NULL DEFAULT TRUE,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+
+                # Домохозяйства (группы): у каждой свои участники, расходы и статистика
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS tenants (
+                        id SERIAL PRIMARY KEY,
+                        name VARCHAR(100) NOT NULL,
+                        invite_code VARCHAR(16) UNIQUE NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+                # Группа по умолчанию помечается явно: не более одной на базу
+                cursor.execute("ALTER TABLE tenants ADD COLUMN IF NOT EXISTS is_default BOOLEAN NOT NULL DEFAULT FALSE")
+                cursor.execute("""
+                    CREATE UNIQUE INDEX IF NOT EXISTS idx_tenants_default
+                    ON tenants (is_default) WHERE is_default
+                """)
+                cursor.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS tenant_id INTEGER REFERENCES tenants(id)")
+                cursor.execute("ALTER TABLE expenses ADD COLUMN IF NOT EXISTS tenant_id INTEGER REFERENCES tenants(id)")
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_tenant ON users (tenant_id)")
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_expenses_tenant_created
+                    ON expenses (tenant_id, created_at)
+                """)
+
+                # В уже заполненной базе группой по умолчанию становится группа пользователей из ALLOWED_USERS
+                cursor.execute("""
+                    UPDATE tenants SET is_default = TRUE
+                    WHERE id = (
+                        SELECT tenant_id FROM users
+                        WHERE telegram_id = ANY(%s) AND tenant_id IS NOT NULL
+                        GROUP BY tenant_id
+                        ORDER BY COUNT(*) DESC
+                        LIMIT 1
+                    )
+                    AND NOT EXISTS (SELECT 1 FROM tenants WHERE is_default)
+                """, (list(ALLOWED_USERS),))
+
+                # Пользователи, появившиеся до групп, переносятся в группу по умолчанию.
+                # Позже tenant_id IS NULL означает «не в группе» (например, получил отказ в /start),
+                # поэтому перенос ограничен миграцией на группы и пользователями из ALLOWED_USERS
+                # или с уже записанными расходами
+                if previous_version < TENANTS_SCHEMA_VERSION:
+                    legacy_users = """
+                        tenant_id IS NULL
+                        AND (telegram_id = ANY(%(allowed)s)
+                             OR EXISTS (SELECT 1 FROM expenses e WHERE e.user_id = users.id))
+                    """
+                    cursor.execute("""
+                        INSERT INTO tenants (name, invite_code, is_default)
+                        SELECT 'Семья', SUBSTRING(MD5(RANDOM()::text) FOR 8), TRUE
+                        WHERE NOT EXISTS (SELECT 1 FROM tenants WHERE is_default)
+                        AND EXISTS (SELECT 1 FROM users WHERE """ + legacy_users + """)
+                    """, {'allowed': list(ALLOWED_USERS)})
+                    cursor.execute("""
+                        UPDATE users SET tenant_id = (SELECT id FROM tenants WHERE is_default)
+                        WHERE """ + legacy_users, {'allowed': list(ALLOWED_USERS)})
+
+                cursor.execute("""
+                    UPDATE expenses e SET tenant_id = u.tenant_id
+                    FROM users u
+                    WHERE e.user_id = u.id AND e.tenant_id IS NULL
+                """)
+
+                # Ключ идемпотентности защищает от повторной вставки регулярных расходов
+                cursor.execute("ALTER TABLE expenses ADD COLUMN IF NOT EXISTS idempotency_key VARCHAR(64)")
+                cursor.execute("""
+                    CREATE UNIQUE INDEX IF NOT EXISTS idx_expenses_idempotency_key
+                    ON expenses (idempotency_key)
+                """)
+
+                self._connection.commit()
                 logging.info("Database initialized successfully")
         except Exception as e:
+            self._connection.rollback()
             logging.info(f"Error initializing database: {e}")
+            return
+
+        # Версия записывается только после всех шагов, иначе при следующем запуске
+        # миграция повторится и недостающие индексы будут созданы
+        if not self.init_search_indexes():
+            logging.info(f"Schema version {SCHEMA_VERSION} not recorded, migration will be retried")
+            return
+
+        try:
+            with self._connection.cursor() as cursor:
+                cursor.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+                cursor.execute("DELETE FROM schema_version")
+                cursor.execute("INSERT INTO schema_version (version) VALUES (%s)", (SCHEMA_VERSION,))
+                self._connection.commit()
+        except Exception as e:
+            self._connection.rollback()
+            logging.info(f"Error saving schema version: {e}")
+
+    def init_search_indexes(self) -> bool:
+        """Триграммный GIN-индекс для поиска по описанию и комментарию; True при успехе"""
+        try:
+            with self._connection.cursor() as cursor:
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_expenses_search_trgm
+                    ON expenses USING GIN ((description || ' ' || COALESCE(comment, '')) gin_trgm_ops)
+                """)
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_expenses_user_created
+                    ON expenses (user_id, created_at)
+                """)
+                self._connection.commit()
+                return True
+        except Exception as e:
+            self._connection.rollback()
+            logging.info(f"Error creating search indexes: {e}")
+            return False
+
+    def create_tenant(self, name: str, invite_code: str):
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("""
+                    INSERT INTO tenants (name, invite_code)
+                    VALUES (%s, %s)
+                    RETURNING id, name, invite_code
+                """, (name, invite_code))
+                tenant = Tenant._make(cursor.fetchone())
+                self.connection.commit()
+                return tenant
+        except Exception as e:
+            self.connection.rollback()
+            logging.info(f"Error creating tenant: {e}")
+            return None
+
+    def get_tenant(self, tenant_id: int = None, invite_code: str = None):
+        """Находит группу по id или по коду приглашения"""
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT id, name, invite_code
+                    FROM tenants
+                    WHERE id = %s OR invite_code = %s
+                """, (tenant_id, invite_code))
+                row = cursor.fetchone()
+                return Tenant._make(row) if row else None
+        except Exception as e:
+            logging.info(f"Error getting tenant: {e}")
+            return None
+
+    def get_default_tenant_id(self):
+        """Группа по умолчанию для пользователей из ALLOWED_USERS (создается при необходимости)"""
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("SELECT id FROM tenants WHERE is_default")
+                row = cursor.fetchone()
+                if row is None:
+                    # Уникальный частичный индекс не даст создать вторую группу по умолчанию
+                    cursor.execute("""
+                        INSERT INTO tenants (name, invite_code, is_default)
+                        VALUES ('Семья', SUBSTRING(MD5(RANDOM()::text) FOR 8), TRUE)
+                        ON CONFLICT (is_default) WHERE is_default DO NOTHING
+                    """)
+                    cursor.execute("SELECT id FROM tenants WHERE is_default")
+                    row = cursor.fetchone()
+                tenant_id = row[0]
+                self.connection.commit()
+                return tenant_id
+        except Exception as e:
+            self.connection.rollback()
+            logging.info(f"Error getting default tenant: {e}")
+            return None
+
+    def get_user_tenant_id(self, telegram_id: int):
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("SELECT tenant_id FROM users WHERE telegram_id = %s", (telegram_id,))
+                row = cursor.fetchone()
+                return row[0] if row else None
+        except Exception as e:
+            logging.info(f"Error getting user tenant: {e}")
+            return None
+
+    def set_user_tenant(self, telegram_id: int, tenant_id: int):
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE users SET tenant_id = %s WHERE telegram_id = %s
+                """, (tenant_id, telegram_id))
+                self.connection.commit()
+                return cursor.rowcount > 0
+        except Exception as e:
+            self.connection.rollback()
+            logging.info(f"Error setting user tenant: {e}")
+            return False
 
     def add_user(self, telegram_id: int, username: str, first_name: str, last_name: str = None):
         try:
@@ -79,26 +353,127 @@ class Database:
         try:
             with self.connection.cursor() as cursor:
                 # Получаем user_id
-                cursor.execute("SELECT id FROM users WHERE telegram_id = %s", (telegram_id,))
+                cursor.execute("SELECT id, tenant_id FROM users WHERE telegram_id = %s", (telegram_id,))
                 user = cursor.fetchone()
                 
                 if user:
                     cursor.execute("""
-                        INSERT INTO expenses (user_id, amount, category, description, comment)
-                        VALUES (%s, %s, %s, %s, %s)
+                        INSERT INTO expenses (user_id, tenant_id, amount, category, description, comment)
+                        VALUES (%s, %s, %s, %s, %s, %s)
                         RETURNING id
-                    """, (user[0], amount, category.value, description, comment))
+                    """, (user[0], user[1], amount, category.value, description, comment))
+                    self._increment_budget_totals(cursor, user[0], category.value, amount)
                     self.connection.commit()
+                    self.bump_data_version(telegram_id, user[1])
                     return True
             return False
         except Exception as e:
+            self.connection.rollback()
             logging.info(f"Error adding expense: {e}")
             return False
 
+    @staticmethod
+    def _fetch_rows(cursor, row_type):
+        """Строит компактные строки из кортежей курсора (без словаря на каждую строку).
+
+        Курсор перебирается построчно, чтобы список кортежей fetchall() не жил
+        одновременно со списком строк.
+        """
+        return list(map(row_type._make, cursor))
+
+    def _increment_budget_totals(self, cursor, user_id: int, category: str, amount: float, created_at=None):
+        """Прибавляет сумму к накопленным итогам бюджетов категории без пересчёта SUM"""
+        cursor.execute("""
+            INSERT INTO budget_totals (user_id, category, period, period_start, spent)
+            SELECT b.user_id, b.category, b.period,
+                   DATE_TRUNC(b.period, COALESCE(%s, CURRENT_TIMESTAMP))::date, %s
+            FROM budgets b
+            WHERE b.user_id = %s AND b.category = %s
+            ON CONFLICT (user_id, category, period, period_start)
+            DO UPDATE SET spent = budget_totals.spent + EXCLUDED.spent
+        """, (created_at, amount, user_id, category))
+
+    def set_budget(self, telegram_id: int, category: Category, period: str, amount: float):
+        """Создает или обновляет бюджет и один раз считает расходы текущего периода"""
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("SELECT id FROM users WHERE telegram_id = %s", (telegram_id,))
+                user = cursor.fetchone()
+                if not user:
+                    return None
+
+                cursor.execute("""
+                    INSERT INTO budgets (user_id, category, period, amount)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT (user_id, category, period) DO UPDATE SET amount = EXCLUDED.amount
+                """, (user[0], category.value, period, amount))
+
+                cursor.execute("""
+                    INSERT INTO budget_totals (user_id, category, period, period_start, spent)
+                    SELECT %(user_id)s, %(category)s, %(period)s,
+                           DATE_TRUNC(%(period)s, CURRENT_DATE)::date,
+                           COALESCE(SUM(e.amount), 0)
+                    FROM expenses e
+                    WHERE e.user_id = %(user_id)s
+                    AND e.category = %(category)s
+                    AND e.created_at >= DATE_TRUNC(%(period)s, CURRENT_DATE)
+                    ON CONFLICT (user_id, category, period, period_start)
+                    DO UPDATE SET spent = EXCLUDED.spent
+                    RETURNING period_start, spent
+                """, {'user_id': user[0], 'category': category.value, 'period': period})
+                total = BudgetTotal._make(cursor.fetchone())
+                self.connection.commit()
+                return total
+        except Exception as e:
+            self.connection.rollback()
+            logging.info(f"Error setting budget: {e}")
+            return None
+
+    def delete_budget(self, telegram_id: int, category: Category, period: str):
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("""
+                    DELETE FROM budgets b
+                    USING users u
+                    WHERE b.user_id = u.id AND u.telegram_id = %s
+                    AND b.category = %s AND b.period = %s
+                """, (telegram_id, category.value, period))
+                self.connection.commit()
+                return cursor.rowcount > 0
+        except Exception as e:
+            self.connection.rollback()
+            logging.info(f"Error deleting budget: {e}")
+            return False
+
+    def get_budgets(self, telegram_id: int):
+        """Получает бюджеты пользователя с накопленными суммами за текущий период"""
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT 
+                        b.category,
+                        b.period,
+                        b.amount,
+                        DATE_TRUNC(b.period, CURRENT_DATE)::date as period_start,
+                        COALESCE(t.spent, 0) as spent
+                    FROM budgets b
+                    JOIN users u ON b.user_id = u.id
+                    LEFT JOIN budget_totals t ON t.user_id = b.user_id
+                        AND t.category = b.category
+                        AND t.period = b.period
+                        AND t.period_start = DATE_TRUNC(b.period, CURRENT_DATE)::date
+                    WHERE u.telegram_id = %s
+                    ORDER BY b.category, b.period
+                """, (telegram_id,))
+                return self._fetch_rows(cursor, BudgetRow)
+        except Exception as e:
+            logging.info(f"Error getting budgets: {e}")
+            return []
+
     def get_user_expenses_by_category_weekly(self, telegram_id: int):
         """Получает расходы пользователя по категориям за текущую неделю (PostgreSQL)"""
         try:
-            with self.connection.cursor(cursor_factory=RealDictCursor) as cursor:
+            with self.connection.cursor() as cursor:
                 cursor.execute("""
                     SELECT 
                         e.category,
@@ -111,15 +486,36 @@ class Database:
                     GROUP BY e.category
                     ORDER BY total_amount DESC
                 """, (telegram_id,))
-                return cursor.fetchall()
+                return self._fetch_rows(cursor, CategoryTotal)
         except Exception as e:
             logging.info(f"Error getting user weekly expenses: {e}")
             return []
 
+    def get_user_expenses_by_category_monthly(self, telegram_id: int):
+        """Получает расходы пользователя по категориям за текущий месяц"""
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT 
+                        e.category,
+                        SUM(e.amount) as total_amount,
+                        COUNT(e.id) as expense_count
+                    FROM expenses e
+                    JOIN users u ON e.user_id = u.id
+                    WHERE u.telegram_id = %s 
+                    AND e.created_at >= DATE_TRUNC('month', CURRENT_DATE)
+                    GROUP BY e.category
+                    ORDER BY total_amount DESC
+                """, (telegram_id,))
+                return self._fetch_rows(cursor, CategoryTotal)
+        except Exception as e:
+            logging.info(f"Error getting user monthly expenses: {e}")
+            return []
+
     def get_user_expenses_by_category_all_time(self, telegram_id: int):
         """Получает расходы пользователя по категориям за всё время"""
         try:
-            with self.connection.cursor(cursor_factory=RealDictCursor) as cursor:
+            with self.connection.cursor() as cursor:
                 cursor.execute("""
                     SELECT 
                         e.category,
@@ -131,15 +527,15 @@ class Database:
                     GROUP BY e.category
                     ORDER BY total_amount DESC
                 """, (telegram_id,))
-                return cursor.fetchall()
+                return self._fetch_rows(cursor, CategoryTotal)
         except Exception as e:
             logging.info(f"Error getting user all-time expenses: {e}")
             return []
 
-    def get_general_statistics_weekly(self):
-        """Получает общую статистику расходов за текущую неделю (PostgreSQL)"""
+    def get_general_statistics_weekly(self, tenant_id: int):
+        """Получает общую статистику расходов группы за текущую неделю (PostgreSQL)"""
         try:
-            with self.connection.cursor(cursor_factory=RealDictCursor) as cursor:
+            with self.connection.cursor() as cursor:
                 cursor.execute("""
                     SELECT 
                         u.first_name,
@@ -148,19 +544,20 @@ class Database:
                         COUNT(e.id) as expense_count
                     FROM expenses e
                     JOIN users u ON e.user_id = u.id
-                    WHERE e.created_at >= DATE_TRUNC('week', CURRENT_DATE)
+                    WHERE e.tenant_id = %s
+                    AND e.created_at >= DATE_TRUNC('week', CURRENT_DATE)
                     GROUP BY u.first_name, e.category
                     ORDER BY u.first_name, total_amount DESC
-                """)
-                return cursor.fetchall()
+                """, (tenant_id,))
+                return self._fetch_rows(cursor, UserCategoryTotal)
         except Exception as e:
             logging.info(f"Error getting general weekly statistics: {e}")
             return []
 
-    def get_general_statistics_all_time(self):
-        """Получает общую статистику расходов за всё время"""
+    def get_general_statistics_all_time(self, tenant_id: int):
+        """Получает общую статистику расходов группы за всё время"""
         try:
-            with self.connection.cursor(cursor_factory=RealDictCursor) as cursor:
+            with self.connection.cursor() as cursor:
                 cursor.execute("""
                     SELECT 
                         u.first_name,
@@ -169,18 +566,19 @@ class Database:
                         COUNT(e.id) as expense_count
                     FROM expenses e
                     JOIN users u ON e.user_id = u.id
+                    WHERE e.tenant_id = %s
                     GROUP BY u.first_name, e.category
                     ORDER BY u.first_name, total_amount DESC
-                """)
-                return cursor.fetchall()
+                """, (tenant_id,))
+                return self._fetch_rows(cursor, UserCategoryTotal)
         except Exception as e:
             logging.info(f"Error getting general all-time statistics: {e}")
             return []
 
-    def get_all_expenses(self):
-        """Получает все расходы со всей информацией"""
+    def get_all_expenses(self, tenant_id: int):
+        """Получает все расходы группы со всей информацией"""
         try:
-            with self.connection.cursor(cursor_factory=RealDictCursor) as cursor:
+            with self.connection.cursor() as cursor:
                 cursor.execute("""
                     SELECT 
                         u.first_name,
@@ -192,16 +590,85 @@ class Database:
                         e.created_at
                     FROM expenses e
                     JOIN users u ON e.user_id = u.id
+                    WHERE e.tenant_id = %s
                     ORDER BY e.created_at DESC
-                """)
-                return cursor.fetchall()
+                """, (tenant_id,))
+                return self._fetch_rows(cursor, ExpenseRecord)
         except Exception as e:
             logging.info(f"Error getting all expenses: {e}")
             return []
+    def get_members(self, tenant_id: int = None, telegram_ids=None):
+        """Пользователи группы (или все), при необходимости только из списка telegram_ids"""
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT telegram_id, first_name
+                    FROM users
+                    WHERE (%(tenant_id)s IS NULL OR tenant_id = %(tenant_id)s)
+                    AND (%(telegram_ids)s IS NULL OR telegram_id = ANY(%(telegram_ids)s))
+                    ORDER BY first_name
+                """, {'tenant_id': tenant_id, 'telegram_ids': telegram_ids})
+                return self._fetch_rows(cursor, Member)
+        except Exception as e:
+            logging.info(f"Error getting members: {e}")
+            return []
+
+    def get_statistics(self, telegram_ids=None, tenant_id: int = None,
+                       date_from: str = None, date_to: str = None):
+        """Статистика по пользователям и категориям с произвольными фильтрами"""
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT 
+                        u.first_name,
+                        e.category,
+                        SUM(e.amount) as total_amount,
+                        COUNT(e.id) as expense_count
+                    FROM expenses e
+                    JOIN users u ON e.user_id = u.id
+                    WHERE (%(telegram_ids)s IS NULL OR u.telegram_id = ANY(%(telegram_ids)s))
+                    AND (%(tenant_id)s IS NULL OR e.tenant_id = %(tenant_id)s)
+                    AND (%(date_from)s IS NULL OR e.created_at >= %(date_from)s::date)
+                    AND (%(date_to)s IS NULL OR e.created_at < %(date_to)s::date + 1)
+                    GROUP BY u.first_name, e.category
+                    ORDER BY u.first_name, total_amount DESC
+                """, {'telegram_ids': telegram_ids, 'tenant_id': tenant_id, 'date_from': date_from, 'date_to': date_to})
+                return self._fetch_rows(cursor, UserCategoryTotal)
+        except Exception as e:
+            logging.info(f"Error getting statistics: {e}")
+            return []
+
+    def get_expenses(self, telegram_id: int = None, tenant_id: int = None,
+                     date_from: str = None, date_to: str = None):
+        """Расходы со всей информацией с произвольными фильтрами (для экспорта)"""
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT 
+                        u.first_name,
+                        u.username,
+                        e.amount,
+                        e.category,
+                        e.description,
+                        e.comment,
+                        e.created_at
+                    FROM expenses e
+                    JOIN users u ON e.user_id = u.id
+                    WHERE (%(telegram_id)s IS NULL OR u.telegram_id = %(telegram_id)s)
+                    AND (%(tenant_id)s IS NULL OR e.tenant_id = %(tenant_id)s)
+                    AND (%(date_from)s IS NULL OR e.created_at >= %(date_from)s::date)
+                    AND (%(date_to)s IS NULL OR e.created_at < %(date_to)s::date + 1)
+                    ORDER BY e.created_at DESC
+                """, {'telegram_id': telegram_id, 'tenant_id': tenant_id, 'date_from': date_from, 'date_to': date_to})
+                return self._fetch_rows(cursor, ExpenseRecord)
+        except Exception as e:
+            logging.info(f"Error getting expenses: {e}")
+            return []
+
     def get_expenses_by_date(self, telegram_id: int, target_date: str):
         """Получает расходы пользователя за конкретную дату"""
         try:
-            with self.connection.cursor(cursor_factory=RealDictCursor) as cursor:
+            with self.connection.cursor() as cursor:
                 cursor.execute("""
                     SELECT 
                         e.category,
@@ -215,10 +682,196 @@ class Database:
                     AND DATE(e.created_at) = %s
                     ORDER BY e.created_at DESC
                 """, (telegram_id, target_date))
-                return cursor.fetchall()
+                return self._fetch_rows(cursor, DatedExpense)
         except Exception as e:
             logging.info(f"Error getting expenses by date: {e}")
             return []
 
-# Глобальный экземпляр базы данных
+    def get_daily_category_series_columns(self, telegram_id: int = None, tenant_id: int = None) -> DailySeriesColumns:
+        """Дневные суммы по категориям с начала прошлого месяца столбцами в массивах NumPy, без объектов-строк"""
+        import numpy as np
+
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT 
+                        DATE(e.created_at) as day,
+                        e.category,
+                        SUM(e.amount)::float8 as total_amount
+                    FROM expenses e
+                    JOIN users u ON e.user_id = u.id
+                    WHERE (%(telegram_id)s IS NULL OR u.telegram_id = %(telegram_id)s)
+                    AND (%(tenant_id)s IS NULL OR e.tenant_id = %(tenant_id)s)
+                    AND e.created_at >= DATE_TRUNC('month', CURRENT_DATE) - INTERVAL '1 month'
+                    GROUP BY DATE(e.created_at), e.category
+                    ORDER BY day
+                """, {'telegram_id': telegram_id, 'tenant_id': tenant_id})
+                rows = cursor.fetchall()
+        except Exception as e:
+            logging.info(f"Error getting daily category series: {e}")
+            rows = []
+
+        days, categories, amounts = zip(*rows) if rows else ((), (), ())
+        return DailySeriesColumns(
+            days=np.array(days, dtype='datetime64[D]'),
+            categories=np.array(categories, dtype=object),
+            amounts=np.array(amounts, dtype=np.float64)
+        )
+
+    def add_recurring_expense(self, telegram_id: int, amount: float, category: Category, description: str,
+                              schedule: str, day_of_period: int):
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("""
+                    INSERT INTO recurring_expenses (user_id, amount, category, description, schedule, day_of_period)
+                    SELECT id, %s, %s, %s, %s, %s FROM users WHERE telegram_id = %s
+                    RETURNING id
+                """, (amount, category.value, description, schedule, day_of_period, telegram_id))
+                row = cursor.fetchone()
+                self.connection.commit()
+                return row[0] if row else None
+        except Exception as e:
+            self.connection.rollback()
+            logging.info(f"Error adding recurring expense: {e}")
+            return None
+
+    def deactivate_recurring_expense(self, telegram_id: int, recurring_id: int):
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE recurring_expenses r
+                    SET active = FALSE
+                    FROM users u
+                    WHERE r.user_id = u.id AND u.telegram_id = %s
+                    AND r.id = %s AND r.active
+                """, (telegram_id, recurring_id))
+                self.connection.commit()
+                return cursor.rowcount > 0
+        except Exception as e:
+            self.connection.rollback()
+            logging.info(f"Error deactivating recurring expense: {e}")
+            return False
+
+    def get_recurring_expenses(self, telegram_id: int = None):
+        """Активные шаблоны регулярных расходов пользователя (или всех пользователей)"""
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT 
+                        r.id,
+                        u.telegram_id,
+                        r.amount,
+                        r.category,
+                        r.description,
+                        r.schedule,
+                        r.day_of_period,
+                        r.start_date,
+                        r.last_materialized
+                    FROM recurring_expenses r
+                    JOIN users u ON r.user_id = u.id
+                    WHERE r.active
+                    AND (%(telegram_id)s IS NULL OR u.telegram_id = %(telegram_id)s)
+                    ORDER BY r.id
+                """, {'telegram_id': telegram_id})
+                return self._fetch_rows(cursor, RecurringExpense)
+        except Exception as e:
+            logging.info(f"Error getting recurring expenses: {e}")
+            return []
+
+    def materialize_recurring_expenses(self, occurrences, materialized_through):
+        """Вставляет все наступившие регулярные расходы одной транзакцией.
+
+        occurrences — кортежи (recurring_id, created_at, idempotency_key);
+        materialized_through — {recurring_id: дата, до которой расходы созданы}.
+        Уже существующие ключи пропускаются, поэтому повторные и параллельные запуски безопасны.
+        Версии данных не увеличиваются: метод вызывается на отдельном подключении в потоке
+        задачи, вызывающий код обновляет версии в event loop.
+        """
+        try:
+            with self.connection.cursor() as cursor:
+                inserted = []
+                if occurrences:
+                    rows = execute_values(cursor, """
+                        INSERT INTO expenses (user_id, tenant_id, amount, category, description, created_at, idempotency_key)
+                        SELECT r.user_id, u.tenant_id, r.amount, r.category, r.description,
+                               v.created_at::timestamp, v.idempotency_key
+                        FROM (VALUES %s) AS v (recurring_id, created_at, idempotency_key)
+                        JOIN recurring_expenses r ON r.id = v.recurring_id
+                        JOIN users u ON r.user_id = u.id
+                        ON CONFLICT (idempotency_key) DO NOTHING
+                        RETURNING user_id, category, amount, created_at
+                    """, occurrences, fetch=True)
+
+                    for user_id, category, amount, created_at in rows:
+                        self._increment_budget_totals(cursor, user_id, category, amount, created_at)
+
+                    if rows:
+                        cursor.execute("""
+                            SELECT id, telegram_id, tenant_id FROM users WHERE id = ANY(%s)
+                        """, (list({row[0] for row in rows}),))
+                        users = {user_id: (telegram_id, tenant_id) for user_id, telegram_id, tenant_id in cursor.fetchall()}
+                        inserted = [
+                            MaterializedExpense(*users[user_id], category, amount, created_at)
+                            for user_id, category, amount, created_at in rows
+                        ]
+
+                if materialized_through:
+                    execute_values(cursor, """
+                        UPDATE recurring_expenses r
+                        SET last_materialized = GREATEST(COALESCE(r.last_materialized, v.through::date), v.through::date)
+                        FROM (VALUES %s) AS v (recurring_id, through)
+                        WHERE r.id = v.recurring_id
+                    """, list(materialized_through.items()))
+
+                self.connection.commit()
+            return inserted
+        except Exception as e:
+            self.connection.rollback()
+            logging.info(f"Error materializing recurring expenses: {e}")
+            return []
+
+    def search_expenses(self, telegram_id: int, query: str, category: str = None,
+                        date_from: str = None, date_to: str = None, limit: int = 10, offset: int = 0):
+        """Ищет расходы по описанию и комментарию (подстрока или похожие слова), с итогами в том же запросе"""
+        pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT 
+                        e.category,
+                        e.amount,
+                        e.description,
+                        e.comment,
+                        e.created_at,
+                        COUNT(*) OVER () as total_count,
+                        SUM(e.amount) OVER () as total_amount
+                    FROM expenses e
+                    JOIN users u ON e.user_id = u.id
+                    WHERE u.telegram_id = %(telegram_id)s
+                    AND (
+                        (e.description || ' ' || COALESCE(e.comment, '')) ILIKE %(pattern)s
+                        OR %(query)s <%% (e.description || ' ' || COALESCE(e.comment, ''))
+                    )
+                    AND (%(category)s IS NULL OR e.category = %(category)s)
+                    AND (%(date_from)s IS NULL OR e.created_at >= %(date_from)s::date)
+                    AND (%(date_to)s IS NULL OR e.created_at < %(date_to)s::date + 1)
+                    ORDER BY e.created_at DESC
+                    LIMIT %(limit)s OFFSET %(offset)s
+                """, {
+                    'telegram_id': telegram_id,
+                    'pattern': pattern,
+                    'query': query,
+                    'category': category,
+                    'date_from': date_from,
+                    'date_to': date_to,
+                    'limit': limit,
+                    'offset': offset,
+                })
+                return self._fetch_rows(cursor, SearchResult)
+        except Exception as e:
+            self.connection.rollback()
+            logging.info(f"Error searching expenses: {e}")
+            return []
+
+# Глобальный экземпляр базы данных (подключение — в main() через db.open())
 db = Database()
\ No newline at end of file
@@ -1,14 +1,13 @@
 import os
 import tempfile
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
-from datetime import datetime
 import logging
-from config import CATEGORIES
+from reports import EXPORT_HEADERS, export_row
 
 def create_expenses_excel(expenses_data):
     """Создает Excel файл с расходами (оптимизированная версия)"""
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, PatternFill
+    from openpyxl.utils import get_column_letter
     
     # Создаем рабочую книгу
     wb = Workbook()
@@ -16,14 +15,7 @@ def create_expenses_excel(expenses_data):
     ws.title = "Расходы"
     
     # Заголовки столбцов
-    headers = [
-        "Пользователь",
-        "Сумма (сум)",
-        "Категория",
-        "Описание", 
-        "Комментарий",
-        "Дата создания"
-    ]
+    headers = EXPORT_HEADERS
     
     # Упрощенные стили для оптимизации
     header_font = Font(bold=True, color="FFFFFF")
@@ -36,19 +28,8 @@ def create_expenses_excel(expenses_data):
         cell.fill = header_fill
     
     # Заполняем данные (только основные поля для уменьшения размера)
-    for row_num, expense in enumerate(expenses_data, 2):
-        ws.cell(row=row_num, column=1, value=expense['first_name'])
-        ws.cell(row=row_num, column=2, value=float(expense['amount']))
-        ws.cell(row=row_num, column=3, value=CATEGORIES.get(expense['category'], expense['category']))
-        ws.cell(row=row_num, column=4, value=expense['description'])
-        ws.cell(row=row_num, column=5, value=expense['comment'] or "")
-        
-        # Форматируем дату
-        if isinstance(expense['created_at'], datetime):
-            date_str = expense['created_at'].strftime("%Y-%m-%d")
-        else:
-            date_str = str(expense['created_at'])[:10]  # Берем только дату
-        ws.cell(row=row_num, column=6, value=date_str)
+    for expense in expenses_data:
+        ws.append(export_row(expense))
     
     # Настраиваем ширину столбцов
     column_widths = [15, 15, 20, 30, 30, 15]
@@ -1,22 +1,29 @@
 from aiogram import Router, types, F
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 import logging
-from aiogram.types import BufferedInputFile, ReplyKeyboardMarkup, KeyboardButton
+from aiogram.types import BufferedInputFile, InlineKeyboardMarkup, InlineKeyboardButton
 import asyncio
+import html
 import os
 from datetime import datetime, timedelta
 
 from database import db
-from keyboards import get_categories_keyboard, get_cancel_keyboard
-from config import CATEGORIES, ALLOWED_USERS, USER_NAMES
+from keyboards import get_main_keyboard, get_categories_keyboard, get_cancel_keyboard
+from config import CATEGORIES, USER_NAMES
 from models import Category
-from utils import format_amount
-from excel_utils import create_expenses_excel, cleanup_excel_file
+from reports import format_amount, format_category_totals, format_general_statistics, format_expenses_by_date
+import stats_cache
+from charts import send_chart
+from budgets import budget_tracker, PERIODS
+from recurring import SCHEDULES, materialize_recurring_expenses
+from tenancy import membership
 
 router = Router()
 
+SEARCH_PAGE_SIZE = 10
+
 # Класс состояний должен быть объявлен в начале
 class ExpenseStates(StatesGroup):
     waiting_for_amount = State()
@@ -25,32 +32,17 @@ class ExpenseStates(StatesGroup):
     waiting_for_comment = State()
     waiting_for_date = State()  # Новое состояние для ввода даты
 
-def get_main_keyboard():
-    """Главная клавиатура с новыми кнопками"""
-    return ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="➕ Добавить расход")],
-            [KeyboardButton(text="📊 Мои расходы за неделю")],
-            [KeyboardButton(text="📈 Общая статистика за неделю")],
-            [KeyboardButton(text="💾 Все мои расходы")],
-            [KeyboardButton(text="🏆 Общая статистика за всё время")],
-            [KeyboardButton(text="📅 Расходы по дате")],
-            [KeyboardButton(text="📊 Экспорт в Excel")]
-        ],
-        resize_keyboard=True
-    )
-
 def check_user_access(user_id: int) -> bool:
-    """Проверяет доступ пользователя"""
-    return user_id in ALLOWED_USERS
+    """Проверяет, что пользователь состоит в группе (по кэшу участников)"""
+    return membership.tenant_of(user_id) is not None
 
 async def send_access_denied(message: types.Message):
     """Отправляет сообщение о запрете доступа"""
     await message.answer(
         "⛔ Доступ запрещен!\n\n"
-        "Этот бот предназначен только для личного использования. "
-        "Если вы считаете, что получили это сообщение по ошибке, "
-        "свяжитесь с администратором."
+        "Вы пока не состоите ни в одной группе.\n"
+        "• Создайте свою: /newgroup &lt;название&gt;\n"
+        "• Или вступите по коду приглашения: /join &lt;код&gt;"
     )
 
 # Добавим команду для получения ID
@@ -60,10 +52,6 @@ async def get_my_id(message: types.Message):
 
 @router.message(Command("start", "help"))
 async def start_command(message: types.Message):
-    if not check_user_access(message.from_user.id):
-        await send_access_denied(message)
-        return
-    
     db.add_user(
         message.from_user.id,
         message.from_user.username,
@@ -71,6 +59,10 @@ async def start_command(message: types.Message):
         message.from_user.last_name
     )
     
+    if membership.bootstrap(message.from_user.id) is None:
+        await send_access_denied(message)
+        return
+    
     user_name = USER_NAMES.get(message.from_user.id, message.from_user.first_name)
     await message.answer(
         f"💰 Добро пожаловать, {user_name}!\n\n"
@@ -79,10 +71,80 @@ async def start_command(message: types.Message):
         "• Смотреть статистику за неделю\n"
         "• Смотреть общую статистику\n"
         "• Посмотреть расходы по конкретной дате\n"
+        "• Смотреть тренды и прогноз расходов\n"
+        "• Задавать бюджеты: /budget food month 500000\n"
+        "• Искать расходы: /find такси\n"
+        "• Регулярные расходы: /recurring\n"
+        "• Пригласить в группу: /invite\n"
         "• Экспортировать данные в Excel",
         reply_markup=get_main_keyboard()
     )
 
+@router.message(Command("newgroup"))
+async def create_group(message: types.Message, command: CommandObject):
+    """Создает новую группу (домохозяйство) и переводит в неё пользователя"""
+    name = (command.args or "").strip()
+    if not name:
+        await message.answer("Использование: /newgroup &lt;название&gt;")
+        return
+    
+    db.add_user(
+        message.from_user.id,
+        message.from_user.username,
+        message.from_user.first_name,
+        message.from_user.last_name
+    )
+    tenant = membership.create_group(message.from_user.id, name[:100])
+    if tenant is None:
+        await message.answer("❌ Ошибка при создании группы")
+        return
+    
+    await message.answer(
+        f"✅ Группа «{html.escape(tenant.name)}» создана!\n\n"
+        f"Код приглашения: <code>{tenant.invite_code}</code>\n"
+        f"Участники вступают командой /join {tenant.invite_code}",
+        reply_markup=get_main_keyboard()
+    )
+
+@router.message(Command("join"))
+async def join_group(message: types.Message, command: CommandObject):
+    """Вступление в группу по коду приглашения"""
+    invite_code = (command.args or "").strip()
+    if not invite_code:
+        await message.answer("Использование: /join &lt;код&gt;")
+        return
+    
+    db.add_user(
+        message.from_user.id,
+        message.from_user.username,
+        message.from_user.first_name,
+        message.from_user.last_name
+    )
+    tenant = membership.join_by_invite(message.from_user.id, invite_code)
+    if tenant is None:
+        await message.answer("❌ Неверный код приглашения")
+        return
+    
+    await message.answer(f"✅ Вы вступили в группу «{html.escape(tenant.name)}»", reply_markup=get_main_keyboard())
+
+@router.message(Command("invite"))
+async def show_invite(message: types.Message):
+    """Показывает код приглашения в группу пользователя"""
+    if not check_user_access(message.from_user.id):
+        await send_access_denied(message)
+        return
+    
+    tenant = db.get_tenant(tenant_id=membership.tenant_of(message.from_user.id))
+    if tenant is None:
+        await message.answer("❌ Группа не найдена")
+        return
+    
+    await message.answer(
+        f"👥 Группа «{html.escape(tenant.name)}»\n\n"
+        f"Код приглашения: <code>{tenant.invite_code}</code>\n"
+        f"Участники вступают командой /join {tenant.invite_code}"
+    )
+
 @router.message(F.text == "➕ Добавить расход")
 async def add_expense_command(message: types.Message, state: FSMContext):
     if not check_user_access(message.from_user.id):
@@ -149,24 +211,7 @@ async def show_expenses_by_date(message: types.Message, state: FSMContext):
         await state.clear()
         return
     
-    total = sum(float(item['amount']) for item in expenses)
-    response = f"📅 Ваши расходы за {target_date}:\n\n"
-    
-    for i, item in enumerate(expenses, 1):
-        category_name = CATEGORIES.get(item['category'], item['category'])
-        formatted_amount = format_amount(item['amount'])
-        time_str = item['created_at'].strftime("%H:%M") if isinstance(item['created_at'], datetime) else ""
-        
-        response += f"{i}. {category_name}: {formatted_amount} сум\n"
-        response += f"   Описание: {item['description']}\n"
-        if item['comment']:
-            response += f"   Комментарий: {item['comment']}\n"
-        if time_str:
-            response += f"   Время: {time_str}\n"
-        response += "\n"
-    
-    formatted_total = format_amount(total)
-    response += f"💵 Итого за день: {formatted_total} сум"
+    response = format_expenses_by_date(target_date, expenses)
     
     await message.answer(response, reply_markup=get_main_keyboard())
     await state.clear()
@@ -178,23 +223,21 @@ async def show_my_expenses_weekly(message: types.Message):
         await send_access_denied(message)
         return
     
-    expenses = db.get_user_expenses_by_category_weekly(message.from_user.id)
+    expenses = stats_cache.get_category_totals(message.from_user.id, 'week')
     
     if not expenses:
         await message.answer("У вас нет расходов за эту неделю 📊")
         return
     
-    total = sum(item['total_amount'] for item in expenses)
-    response = "📊 Ваши расходы за текущую неделю:\n\n"
+    await message.answer(format_category_totals("📊 Ваши расходы за текущую неделю:", expenses, "Итого за неделю"))
     
-    for item in expenses:
-        category_name = CATEGORIES.get(item['category'], item['category'])
-        formatted_amount = format_amount(item['total_amount'])
-        response += f"{category_name}: {formatted_amount} сум ({item['expense_count']} раз)\n"
-    
-    formatted_total = format_amount(total)
-    response += f"\n💵 Итого за неделю: {formatted_total} сум"
-    await message.answer(response)
+    await send_chart(
+        message,
+        'pie',
+        "Расходы за неделю",
+        [CATEGORIES.get(item.category, item.category) for item in expenses],
+        [float(item.total_amount) for item in expenses]
+    )
 
 @router.message(F.text == "💾 Все мои расходы")
 async def show_my_expenses_all_time(message: types.Message):
@@ -203,23 +246,13 @@ async def show_my_expenses_all_time(message: types.Message):
         await send_access_denied(message)
         return
     
-    expenses = db.get_user_expenses_by_category_all_time(message.from_user.id)
+    expenses = stats_cache.get_category_totals(message.from_user.id, 'all')
     
     if not expenses:
         await message.answer("У вас нет расходов 📊")
         return
     
-    total = sum(item['total_amount'] for item in expenses)
-    response = "💾 Все ваши расходы:\n\n"
-    
-    for item in expenses:
-        category_name = CATEGORIES.get(item['category'], item['category'])
-        formatted_amount = format_amount(item['total_amount'])
-        response += f"{category_name}: {formatted_amount} сум ({item['expense_count']} раз)\n"
-    
-    formatted_total = format_amount(total)
-    response += f"\n💵 Общий итог: {formatted_total} сум"
-    await message.answer(response)
+    await message.answer(format_category_totals("💾 Все ваши расходы:", expenses, "Общий итог"))
 
 @router.message(F.text == "📈 Общая статистика за неделю")
 async def show_general_statistics_weekly(message: types.Message):
@@ -228,38 +261,13 @@ async def show_general_statistics_weekly(message: types.Message):
         await send_access_denied(message)
         return
     
-    expenses = db.get_general_statistics_weekly()
+    expenses = db.get_general_statistics_weekly(membership.tenant_of(message.from_user.id))
     
     if not expenses:
         await message.answer("Нет данных о расходах за эту неделю 📊")
         return
     
-    # Группируем по пользователям
-    users_data = {}
-    for item in expenses:
-        if item['first_name'] not in users_data:
-            users_data[item['first_name']] = []
-        users_data[item['first_name']].append(item)
-    
-    response = "📈 Общая статистика расходов за текущую неделю:\n\n"
-    grand_total = 0
-    
-    for user_name, user_expenses in users_data.items():
-        user_total = sum(item['total_amount'] for item in user_expenses)
-        grand_total += user_total
-        
-        response += f"👤 {user_name}:\n"
-        
-        for item in user_expenses:
-            category_name = CATEGORIES.get(item['category'], item['category'])
-            formatted_amount = format_amount(item['total_amount'])
-            response += f"   {category_name}: {formatted_amount} сум ({item['expense_count']} покупок)\n"
-        
-        formatted_user_total = format_amount(user_total)
-        response += f"   💵 Итого: {formatted_user_total} сум\n\n"
-    
-    formatted_grand_total = format_amount(grand_total)
-    response += f"🏆 Общая сумма за неделю: {formatted_grand_total} сум"
+    response = format_general_statistics("📈 Общая статистика расходов за текущую неделю:", expenses, "Общая сумма за неделю")
     await message.answer(response)
 
 @router.message(F.text == "🏆 Общая статистика за всё время")
@@ -269,51 +277,377 @@ async def show_general_statistics_all_time(message: types.Message):
         await send_access_denied(message)
         return
     
-    expenses = db.get_general_statistics_all_time()
+    expenses = db.get_general_statistics_all_time(membership.tenant_of(message.from_user.id))
     
     if not expenses:
         await message.answer("Нет данных о расходах 📊")
         return
     
-    # Группируем по пользователям
-    users_data = {}
-    for item in expenses:
-        if item['first_name'] not in users_data:
-            users_data[item['first_name']] = []
-        users_data[item['first_name']].append(item)
+    response = format_general_statistics("🏆 Общая статистика расходов за всё время:", expenses, "Общая сумма всех расходов")
+    await message.answer(response)
+
+async def send_month_chart(message: types.Message, analytics):
+    """Отправляет график дневных расходов за текущий месяц"""
+    if analytics.month_total <= 0:
+        return
+    
+    await send_chart(
+        message,
+        'daily_line',
+        "Расходы по дням за месяц",
+        list(range(1, len(analytics.month_daily) + 1)),
+        [round(float(value), 2) for value in analytics.month_daily]
+    )
+
+@router.message(F.text == "📉 Моя аналитика")
+async def show_my_analytics(message: types.Message):
+    """Тренды, скользящее среднее и прогноз по расходам пользователя"""
+    if not check_user_access(message.from_user.id):
+        await send_access_denied(message)
+        return
+    
+    from analytics import get_analytics, format_analytics
+    analytics = get_analytics(message.from_user.id)
+    if analytics.month_total <= 0 and analytics.prev_month_same_period <= 0:
+        await message.answer("Недостаточно данных для аналитики 📉")
+        return
     
-    response = "🏆 Общая статистика расходов за всё время:\n\n"
-    grand_total = 0
+    await message.answer(format_analytics(analytics, "📉 Ваша аналитика расходов:"))
+    await send_month_chart(message, analytics)
+
+@router.message(F.text == "📉 Общая аналитика")
+async def show_general_analytics(message: types.Message):
+    """Тренды, скользящее среднее и прогноз по всем расходам"""
+    if not check_user_access(message.from_user.id):
+        await send_access_denied(message)
+        return
     
-    for user_name, user_expenses in users_data.items():
-        user_total = sum(item['total_amount'] for item in user_expenses)
-        grand_total += user_total
-        
-        response += f"👤 {user_name}:\n"
-        
-        for item in user_expenses:
-            category_name = CATEGORIES.get(item['category'], item['category'])
-            formatted_amount = format_amount(item['total_amount'])
-            response += f"   {category_name}: {formatted_amount} сум ({item['expense_count']} покупок)\n"
-        
-        formatted_user_total = format_amount(user_total)
-        response += f"   💵 Итого: {formatted_user_total} сум\n\n"
+    from analytics import get_analytics, format_analytics
+    analytics = get_analytics(tenant_id=membership.tenant_of(message.from_user.id))
+    if analytics.month_total <= 0 and analytics.prev_month_same_period <= 0:
+        await message.answer("Недостаточно данных для аналитики 📉")
+        return
     
-    formatted_grand_total = format_amount(grand_total)
-    response += f"🏆 Общая сумма всех расходов: {formatted_grand_total} сум"
+    await message.answer(format_analytics(analytics, "📉 Общая аналитика расходов:"))
+    await send_month_chart(message, analytics)
+
+def parse_category(text: str):
+    """Находит категорию по ключу (food) или по названию (Еда); пустой или неоднозначный текст — None"""
+    text = text.strip().lower()
+    if not text:
+        return None
+    if text in CATEGORIES:
+        return Category(text)
+    
+    matches = [key for key, value in CATEGORIES.items() if key.startswith(text) or text in value.lower()]
+    if len(matches) != 1:
+        return None
+    return Category(matches[0])
+
+@router.message(Command("budget"))
+async def set_budget_command(message: types.Message, command: CommandObject):
+    """Устанавливает бюджет: /budget <категория> <week|month> <сумма>, 0 — удалить"""
+    if not check_user_access(message.from_user.id):
+        await send_access_denied(message)
+        return
+    
+    args = (command.args or "").split()
+    usage = (
+        "Использование: /budget &lt;категория&gt; &lt;week|month&gt; &lt;сумма&gt;\n"
+        "Например: /budget food month 500000\n"
+        "Сумма 0 удаляет бюджет"
+    )
+    if len(args) != 3:
+        await message.answer(usage)
+        return
+    
+    category = parse_category(args[0])
+    period = args[1].lower()
+    try:
+        amount = float(args[2].replace(',', '.'))
+    except ValueError:
+        amount = -1
+    
+    if category is None or period not in PERIODS or amount < 0:
+        await message.answer(usage)
+        return
+    
+    category_name = CATEGORIES[category.value]
+    if amount == 0:
+        if budget_tracker.remove_budget(message.from_user.id, category, period):
+            await message.answer(f"🗑 Бюджет «{category_name}» на {PERIODS[period]} удален")
+        else:
+            await message.answer("Такого бюджета нет")
+        return
+    
+    state = budget_tracker.set_budget(message.from_user.id, category, period, amount)
+    if state is None:
+        await message.answer("❌ Ошибка при сохранении бюджета")
+        return
+    
+    await message.answer(
+        f"✅ Бюджет «{category_name}» на {PERIODS[period]}: {format_amount(amount)} сум\n"
+        f"Уже потрачено: {format_amount(state.spent)} сум"
+    )
+
+@router.message(Command("budgets"))
+async def show_budgets(message: types.Message):
+    """Показывает бюджеты пользователя и их использование"""
+    if not check_user_access(message.from_user.id):
+        await send_access_denied(message)
+        return
+    
+    states = budget_tracker.get_states(message.from_user.id)
+    if not states:
+        await message.answer("У вас нет бюджетов. Задайте: /budget food month 500000")
+        return
+    
+    response = "💰 Ваши бюджеты:\n\n"
+    for (category, period), state in states.items():
+        category_name = CATEGORIES.get(category, category)
+        percent = state.spent / state.limit * 100 if state.limit else 0
+        response += (
+            f"{category_name} на {PERIODS[period]}: "
+            f"{format_amount(state.spent)} / {format_amount(state.limit)} сум ({percent:.0f}%)\n"
+        )
     await message.answer(response)
 
+def parse_search_args(args: str):
+    """Разбирает '/find такси #food с 2024-01-01 по 2024-01-31' на запрос и фильтры.
+
+    Возвращает None, если категория не распознана или после 'с'/'по' нет даты.
+    """
+    words, category, date_from, date_to = [], None, None, None
+    tokens = args.split()
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token.startswith('#'):
+            found = parse_category(token[1:])
+            if found is None:
+                return None
+            category = found.value
+        elif token.lower() in ('с', 'по'):
+            if i + 1 >= len(tokens) or not is_valid_date(tokens[i + 1]):
+                return None
+            if token.lower() == 'с':
+                date_from = tokens[i + 1]
+            else:
+                date_to = tokens[i + 1]
+            i += 1
+        else:
+            words.append(token)
+        i += 1
+    return {'query': ' '.join(words), 'category': category, 'date_from': date_from, 'date_to': date_to}
+
+def is_valid_date(text: str) -> bool:
+    try:
+        datetime.strptime(text, "%Y-%m-%d")
+        return True
+    except ValueError:
+        return False
+
+def render_search_page(search: dict, expenses, offset: int):
+    """Формирует текст страницы результатов поиска и кнопки навигации"""
+    total_count = expenses[0].total_count
+    response = f"🔎 Найдено по запросу «{html.escape(search['query'])}»: {total_count}\n"
+    response += f"💵 Сумма найденного: {format_amount(expenses[0].total_amount)} сум\n\n"
+    
+    for i, item in enumerate(expenses, offset + 1):
+        category_name = CATEGORIES.get(item.category, item.category)
+        date_str = item.created_at.strftime("%Y-%m-%d") if isinstance(item.created_at, datetime) else ""
+        response += f"{i}. {category_name}: {format_amount(item.amount)} сум ({date_str})\n"
+        response += f"   Описание: {html.escape(item.description)}\n"
+        if item.comment:
+            response += f"   Комментарий: {html.escape(item.comment)}\n"
+    
+    buttons = []
+    if offset > 0:
+        buttons.append(InlineKeyboardButton(text="⬅️ Назад", callback_data=f"find_{max(offset - SEARCH_PAGE_SIZE, 0)}"))
+    if offset + SEARCH_PAGE_SIZE < total_count:
+        buttons.append(InlineKeyboardButton(text="Вперед ➡️", callback_data=f"find_{offset + SEARCH_PAGE_SIZE}"))
+    markup = InlineKeyboardMarkup(inline_keyboard=[buttons]) if buttons else None
+    return response, markup
+
+@router.message(Command("find"))
+async def find_expenses(message: types.Message, command: CommandObject, state: FSMContext):
+    """Поиск расходов по описанию и комментарию"""
+    if not check_user_access(message.from_user.id):
+        await send_access_denied(message)
+        return
+    
+    search = parse_search_args(command.args or "")
+    if not search or not search['query']:
+        await message.answer(
+            "Использование: /find &lt;текст&gt; [#категория] [с ГГГГ-ММ-ДД] [по ГГГГ-ММ-ДД]\n"
+            "Например: /find такси #other с 2024-01-01 по 2024-01-31"
+        )
+        return
+    
+    expenses = db.search_expenses(message.from_user.id, limit=SEARCH_PAGE_SIZE, **search)
+    if not expenses:
+        await message.answer(f"🔎 Ничего не найдено по запросу «{html.escape(search['query'])}»")
+        return
+    
+    await state.update_data(search=search)
+    response, markup = render_search_page(search, expenses, 0)
+    await message.answer(response, reply_markup=markup)
+
+@router.callback_query(F.data.startswith("find_"))
+async def find_expenses_page(callback: types.CallbackQuery, state: FSMContext):
+    """Переключение страниц результатов поиска"""
+    if not check_user_access(callback.from_user.id):
+        await callback.message.answer("⛔ Доступ запрещен!")
+        return
+    
+    search = (await state.get_data()).get('search')
+    if not search:
+        await callback.answer("Поиск устарел, повторите /find")
+        return
+    
+    offset = int(callback.data.split('_')[1])
+    expenses = db.search_expenses(callback.from_user.id, limit=SEARCH_PAGE_SIZE, offset=offset, **search)
+    if not expenses:
+        await callback.answer("Больше результатов нет")
+        return
+    
+    response, markup = render_search_page(search, expenses, offset)
+    await callback.message.edit_text(response, reply_markup=markup)
+    await callback.answer()
+
+RECURRING_USAGE = (
+    "Использование: /recurring_add &lt;сумма&gt; &lt;категория&gt; &lt;daily|weekly|monthly&gt; [день] &lt;описание&gt;\n"
+    "Например: /recurring_add 3000000 home monthly 1 Аренда квартиры\n"
+    "День — число месяца для monthly или день недели (1 — понедельник) для weekly"
+)
+
+@router.message(Command("recurring"))
+async def show_recurring(message: types.Message):
+    """Список регулярных расходов пользователя"""
+    if not check_user_access(message.from_user.id):
+        await send_access_denied(message)
+        return
+    
+    templates = db.get_recurring_expenses(message.from_user.id)
+    if not templates:
+        await message.answer(f"У вас нет регулярных расходов.\n\n{RECURRING_USAGE}")
+        return
+    
+    response = "🔁 Ваши регулярные расходы:\n\n"
+    for template in templates:
+        category_name = CATEGORIES.get(template.category, template.category)
+        schedule = SCHEDULES.get(template.schedule, template.schedule)
+        if template.schedule != 'daily':
+            schedule += f" (день {template.day_of_period})"
+        response += (
+            f"#{template.id} {html.escape(template.description)}: {format_amount(template.amount)} сум, "
+            f"{category_name}, {schedule}\n"
+        )
+    response += "\nУдалить: /recurring_del &lt;номер&gt;"
+    await message.answer(response)
+
+@router.message(Command("recurring_add"))
+async def add_recurring(message: types.Message, command: CommandObject):
+    """Добавляет шаблон регулярного расхода"""
+    if not check_user_access(message.from_user.id):
+        await send_access_denied(message)
+        return
+    
+    args = (command.args or "").split()
+    if len(args) < 4:
+        await message.answer(RECURRING_USAGE)
+        return
+    
+    try:
+        amount = float(args[0].replace(',', '.'))
+    except ValueError:
+        amount = 0
+    category = parse_category(args[1])
+    schedule = args[2].lower()
+    
+    rest = args[3:]
+    day_of_period = 1
+    if rest[0].isdigit() and len(rest) > 1:
+        day_of_period = int(rest[0])
+        rest = rest[1:]
+    elif schedule == 'monthly':
+        day_of_period = datetime.now().day
+    elif schedule == 'weekly':
+        day_of_period = datetime.now().isoweekday()
+    description = ' '.join(rest)
+    
+    max_day = {'daily': 1, 'weekly': 7, 'monthly': 31}.get(schedule)
+    if amount <= 0 or category is None or max_day is None or not 1 <= day_of_period <= max_day:
+        await message.answer(RECURRING_USAGE)
+        return
+    
+    recurring_id = db.add_recurring_expense(
+        message.from_user.id, amount, category, description, schedule, day_of_period
+    )
+    if recurring_id is None:
+        await message.answer("❌ Ошибка при добавлении регулярного расхода")
+        return
+    
+    await message.answer(
+        f"✅ Регулярный расход #{recurring_id} добавлен: {html.escape(description)}, "
+        f"{format_amount(amount)} сум, {SCHEDULES[schedule]}"
+    )
+    await materialize_recurring_expenses()
+
+@router.message(Command("recurring_del"))
+async def delete_recurring(message: types.Message, command: CommandObject):
+    """Отключает шаблон регулярного расхода"""
+    if not check_user_access(message.from_user.id):
+        await send_access_denied(message)
+        return
+    
+    arg = (command.args or "").strip().lstrip('#')
+    if not arg.isdigit():
+        await message.answer("Использование: /recurring_del &lt;номер&gt;")
+        return
+    
+    if db.deactivate_recurring_expense(message.from_user.id, int(arg)):
+        await message.answer(f"🗑 Регулярный расход #{arg} удален")
+    else:
+        await message.answer("Такого регулярного расхода нет")
+
+@router.inline_query()
+async def inline_stats(inline_query: types.InlineQuery):
+    """Inline-режим: @bot week, @bot month food, @bot all"""
+    if not check_user_access(inline_query.from_user.id):
+        await inline_query.answer(
+            [],
+            cache_time=60,
+            is_personal=True,
+            switch_pm_text="Открыть бота",
+            switch_pm_parameter="start"
+        )
+        return
+    
+    period, category = None, None
+    for token in inline_query.query.lower().split():
+        if token in stats_cache.PERIOD_ALIASES:
+            period = stats_cache.PERIOD_ALIASES[token]
+        elif parse_category(token):
+            category = parse_category(token).value
+    
+    periods = [period] if period else list(stats_cache.PERIODS)
+    results = [stats_cache.get_article(inline_query.from_user.id, item, category) for item in periods]
+    await inline_query.answer(results, cache_time=60, is_personal=True)
+
 @router.message(F.text == "📊 Экспорт в Excel")
 async def export_to_excel(message: types.Message):
     if not check_user_access(message.from_user.id):
         await send_access_denied(message)
         return
     
+    # openpyxl импортируется только при реальном экспорте
+    from excel_utils import create_expenses_excel, cleanup_excel_file
     excel_file_path = None
     
     try:
         await message.answer("🔄 Создаем отчет...")
-        expenses = db.get_all_expenses()
+        expenses = db.get_all_expenses(membership.tenant_of(message.from_user.id))
         
         if not expenses:
             await message.answer("Нет данных о расходах для экспорта 📊")
@@ -337,7 +671,7 @@ async def export_to_excel(message: types.Message):
             document=document,
             caption=f"📊 Отчет по расходам\n\n"
                    f"Всего записей: {len(expenses)}\n"
-                   f"Общая сумма: {format_amount(sum(float(expense['amount']) for expense in expenses))} сум"
+                   f"Общая сумма: {format_amount(sum(float(expense.amount) for expense in expenses))} сум"
         )
         
     except Exception as e:
@@ -429,6 +763,9 @@ async def process_comment(message: types.Message, state: FSMContext):
             f"Комментарий: {comment if comment else 'нет'}",
             reply_markup=get_main_keyboard()
         )
+        
+        for alert in budget_tracker.record(message.from_user.id, data['category'], data['amount']):
+            await message.answer(alert)
     else:
         await message.answer(
             "❌ Ошибка при добавлении расхода",
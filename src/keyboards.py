@@ -1,18 +1,23 @@
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
 from config import CATEGORIES
 
-def get_main_keyboard():
-    return ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="➕ Добавить расход")],
-            [KeyboardButton(text="📊 Мои расходы за неделю")],
-            [KeyboardButton(text="📈 Общая статистика")],
-            [KeyboardButton(text="📊 Экспорт в Excel")]
-        ],
-        resize_keyboard=True
-    )
+# Клавиатуры неизменны, поэтому строятся один раз при импорте, а не на каждое сообщение
 
-def get_categories_keyboard():
+MAIN_KEYBOARD = ReplyKeyboardMarkup(
+    keyboard=[
+        [KeyboardButton(text="➕ Добавить расход")],
+        [KeyboardButton(text="📊 Мои расходы за неделю")],
+        [KeyboardButton(text="📈 Общая статистика за неделю")],
+        [KeyboardButton(text="💾 Все мои расходы")],
+        [KeyboardButton(text="🏆 Общая статистика за всё время")],
+        [KeyboardButton(text="📅 Расходы по дате")],
+        [KeyboardButton(text="📉 Моя аналитика"), KeyboardButton(text="📉 Общая аналитика")],
+        [KeyboardButton(text="📊 Экспорт в Excel")]
+    ],
+    resize_keyboard=True
+)
+
+def _build_categories_keyboard():
     buttons = []
     row = []
     for key, value in CATEGORIES.items():
@@ -22,11 +27,21 @@ def get_categories_keyboard():
             row = []
     if row:
         buttons.append(row)
-    
+
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
+CATEGORIES_KEYBOARD = _build_categories_keyboard()
+
+CANCEL_KEYBOARD = ReplyKeyboardMarkup(
+    keyboard=[[KeyboardButton(text="❌ Отмена")]],
+    resize_keyboard=True
+)
+
+def get_main_keyboard():
+    return MAIN_KEYBOARD
+
+def get_categories_keyboard():
+    return CATEGORIES_KEYBOARD
+
 def get_cancel_keyboard():
-    return ReplyKeyboardMarkup(
-        keyboard=[[KeyboardButton(text="❌ Отмена")]],
-        resize_keyboard=True
-    )
\ No newline at end of file
+    return CANCEL_KEYBOARD
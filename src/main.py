@@ -1,3 +1,6 @@
+import time
+_started_at = time.perf_counter()
+
 import asyncio
 import logging
 from aiogram import Bot, Dispatcher
@@ -5,20 +8,32 @@ from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from datetime import datetime
 
 from config import BOT_TOKEN
 from handlers import router
 from utils import send_weekly_report
+from recurring import materialize_recurring_expenses
 from database import db
+from startup import StartupTimer
+import charts
 
 logging.basicConfig(level=logging.INFO)
 
+startup_timer = StartupTimer(_started_at)
+startup_timer.mark("imports")
+
 async def main():
+    # Подключение и проверка схемы — здесь, а не при импорте модулей
+    await db.open()
+    startup_timer.mark("database")
+    
     bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
     dp = Dispatcher()
     
     # Подключаем router
     dp.include_router(router)
+    startup_timer.mark("bot")
     
     # Настраиваем планировщик
     scheduler = AsyncIOScheduler()
@@ -27,7 +42,17 @@ async def main():
         CronTrigger(day_of_week=4, hour=18, minute=0),
         args=[bot]
     )
+    # Регулярные расходы: сразу при запуске (догоняем пропущенное) и далее каждый час
+    scheduler.add_job(
+        materialize_recurring_expenses,
+        CronTrigger(minute=5),
+        next_run_time=datetime.now(),
+        max_instances=1,
+        coalesce=True
+    )
     scheduler.start()
+    startup_timer.mark("scheduler")
+    startup_timer.report()
     
     try:
         await dp.start_polling(bot)
@@ -37,9 +62,9 @@ async def main():
         logging.error(f"Unexpected error: {e}")
     finally:
         await bot.session.close()
-        if db.connection:
-            db.connection.close()
+        db.close()
         scheduler.shutdown()
+        charts.shutdown()
 
 if __name__ == '__main__':
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
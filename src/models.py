@@ -1,7 +1,8 @@
 from enum import Enum
 from dataclasses import dataclass
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, NamedTuple, Optional
 
 class Category(str, Enum):
     ENTERTAINMENT = 'entertainment'
@@ -10,19 +11,102 @@ class Category(str, Enum):
     HOME = 'home'
     OTHER = 'other'
 
-@dataclass
+@dataclass(slots=True)
 class User:
     id: int
     username: str
     first_name: str
     last_name: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True)
 class Expense:
     id: int
     user_id: int
-    amount: float
+    amount: Decimal
     category: Category
     description: str
     created_at: datetime
-    comment: Optional[str] = None
\ No newline at end of file
+    comment: Optional[str] = None
+
+# Строки результатов запросов: кортежи без словаря на каждую строку,
+# поля в порядке столбцов SELECT, суммы — Decimal как их отдает psycopg2
+
+class CategoryTotal(NamedTuple):
+    category: str
+    total_amount: Decimal
+    expense_count: int
+
+class UserCategoryTotal(NamedTuple):
+    first_name: str
+    category: str
+    total_amount: Decimal
+    expense_count: int
+
+class ExpenseRecord(NamedTuple):
+    first_name: str
+    username: Optional[str]
+    amount: Decimal
+    category: str
+    description: str
+    comment: Optional[str]
+    created_at: datetime
+
+class DatedExpense(NamedTuple):
+    category: str
+    amount: Decimal
+    description: str
+    comment: Optional[str]
+    created_at: datetime
+
+class SearchResult(NamedTuple):
+    category: str
+    amount: Decimal
+    description: str
+    comment: Optional[str]
+    created_at: datetime
+    total_count: int
+    total_amount: Decimal
+
+class BudgetRow(NamedTuple):
+    category: str
+    period: str
+    amount: Decimal
+    period_start: date
+    spent: Decimal
+
+class BudgetTotal(NamedTuple):
+    period_start: date
+    spent: Decimal
+
+class DailySeriesColumns(NamedTuple):
+    """Дневной ряд по категориям столбцами: массивы NumPy одинаковой длины (день, категория, сумма)"""
+    days: Any
+    categories: Any
+    amounts: Any
+
+class RecurringExpense(NamedTuple):
+    id: int
+    telegram_id: int
+    amount: Decimal
+    category: str
+    description: str
+    schedule: str
+    day_of_period: int
+    start_date: date
+    last_materialized: Optional[date]
+
+class MaterializedExpense(NamedTuple):
+    telegram_id: int
+    tenant_id: Optional[int]
+    category: str
+    amount: Decimal
+    created_at: datetime
+
+class Tenant(NamedTuple):
+    id: int
+    name: str
+    invite_code: str
+
+class Member(NamedTuple):
+    telegram_id: int
+    first_name: str
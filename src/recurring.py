@@ -0,0 +1,87 @@
+import asyncio
+import calendar
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import List
+
+from database import db, Database
+from budgets import budget_tracker
+from models import MaterializedExpense
+
+SCHEDULES = {
+    'daily': 'каждый день',
+    'weekly': 'каждую неделю',
+    'monthly': 'каждый месяц',
+}
+
+def occurs_on(schedule: str, day_of_period: int, day: date) -> bool:
+    """Проверяет, приходится ли регулярный расход на дату"""
+    if schedule == 'daily':
+        return True
+    if schedule == 'weekly':
+        return day.isoweekday() == day_of_period
+    # Для 29–31 числа в коротких месяцах берем последний день месяца
+    last_day = calendar.monthrange(day.year, day.month)[1]
+    return day.day == min(day_of_period, last_day)
+
+def occurrences(schedule: str, day_of_period: int, start: date, end: date) -> List[date]:
+    """Все даты срабатывания в интервале [start, end]"""
+    result = []
+    day = start
+    while day <= end:
+        if occurs_on(schedule, day_of_period, day):
+            result.append(day)
+        day += timedelta(days=1)
+    return result
+
+def idempotency_key(recurring_id: int, day: date) -> str:
+    return f"recurring:{recurring_id}:{day.isoformat()}"
+
+# Не дает запуску из /recurring_add пересечься с задачей планировщика
+_lock = asyncio.Lock()
+
+def materialize_due(database: Database, today: date = None) -> List[MaterializedExpense]:
+    """Создает все наступившие (в том числе пропущенные) регулярные расходы всех пользователей"""
+    today = today or date.today()
+    pending = []
+    materialized_through = {}
+
+    for template in database.get_recurring_expenses():
+        if template.last_materialized:
+            start = template.last_materialized + timedelta(days=1)
+        else:
+            start = template.start_date
+        if start > today:
+            continue
+
+        for day in occurrences(template.schedule, template.day_of_period, start, today):
+            pending.append((template.id, datetime.combine(day, time()), idempotency_key(template.id, day)))
+        materialized_through[template.id] = today
+
+    inserted = database.materialize_recurring_expenses(pending, materialized_through)
+    if inserted:
+        logging.info(f"Materialized {len(inserted)} recurring expenses")
+    return inserted
+
+def _materialize_on_own_connection() -> List[MaterializedExpense]:
+    """Выполняется в потоке: отдельное подключение, чтобы не делить транзакцию с обработчиками"""
+    job_db = Database()
+    try:
+        job_db.connect()
+        return materialize_due(job_db)
+    except Exception as e:
+        logging.info(f"Error materializing recurring expenses: {e}")
+        return []
+    finally:
+        job_db.close()
+
+async def materialize_recurring_expenses():
+    """Задача планировщика: пакетная вставка выполняется вне event loop"""
+    async with _lock:
+        inserted = await asyncio.to_thread(_materialize_on_own_connection)
+
+    # Версии данных и трекер бюджетов меняются только в потоке event loop
+    for telegram_id, tenant_id in {(expense.telegram_id, expense.tenant_id) for expense in inserted}:
+        db.bump_data_version(telegram_id, tenant_id)
+        # Итоги бюджетов уже обновлены в БД — перечитываем их при следующем обращении
+        budget_tracker.forget(telegram_id)
@@ -0,0 +1,112 @@
+import csv
+from datetime import datetime
+from typing import TextIO
+
+from config import CATEGORIES
+
+# Общие текстовые отчеты для бота и командной строки (без зависимостей от aiogram и БД)
+
+EXPORT_HEADERS = [
+    "Пользователь",
+    "Сумма (сум)",
+    "Категория",
+    "Описание",
+    "Комментарий",
+    "Дата создания"
+]
+
+def format_amount(amount):
+    """Форматирует сумму с пробелами для тысяч"""
+    try:
+        # Форматируем число с пробелами между тысячами
+        return f"{amount:,.0f}".replace(",", " ").replace(".", " ")
+    except (ValueError, TypeError):
+        return str(amount)
+
+def format_category_totals(title: str, expenses, total_label: str) -> str:
+    """Текст со списком сумм по категориям и итогом"""
+    total = sum(item.total_amount for item in expenses)
+    response = f"{title}\n\n"
+
+    for item in expenses:
+        category_name = CATEGORIES.get(item.category, item.category)
+        formatted_amount = format_amount(item.total_amount)
+        response += f"{category_name}: {formatted_amount} сум ({item.expense_count} раз)\n"
+
+    formatted_total = format_amount(total)
+    response += f"\n💵 {total_label}: {formatted_total} сум"
+    return response
+
+def format_general_statistics(title: str, expenses, grand_total_label: str = None) -> str:
+    """Текст общей статистики, сгруппированной по пользователям"""
+    # Группируем по пользователям
+    users_data = {}
+    for item in expenses:
+        if item.first_name not in users_data:
+            users_data[item.first_name] = []
+        users_data[item.first_name].append(item)
+
+    response = f"{title}\n\n"
+    grand_total = 0
+
+    for user_name, user_expenses in users_data.items():
+        user_total = sum(item.total_amount for item in user_expenses)
+        grand_total += user_total
+
+        response += f"👤 {user_name}:\n"
+
+        for item in user_expenses:
+            category_name = CATEGORIES.get(item.category, item.category)
+            formatted_amount = format_amount(item.total_amount)
+            response += f"   {category_name}: {formatted_amount} сум ({item.expense_count} покупок)\n"
+
+        formatted_user_total = format_amount(user_total)
+        response += f"   💵 Итого: {formatted_user_total} сум\n\n"
+
+    if grand_total_label:
+        formatted_grand_total = format_amount(grand_total)
+        response += f"🏆 {grand_total_label}: {formatted_grand_total} сум"
+    return response
+
+def format_expenses_by_date(target_date: str, expenses) -> str:
+    """Текст со списком расходов за день"""
+    total = sum(float(item.amount) for item in expenses)
+    response = f"📅 Ваши расходы за {target_date}:\n\n"
+
+    for i, item in enumerate(expenses, 1):
+        category_name = CATEGORIES.get(item.category, item.category)
+        formatted_amount = format_amount(item.amount)
+        time_str = item.created_at.strftime("%H:%M") if isinstance(item.created_at, datetime) else ""
+
+        response += f"{i}. {category_name}: {formatted_amount} сум\n"
+        response += f"   Описание: {item.description}\n"
+        if item.comment:
+            response += f"   Комментарий: {item.comment}\n"
+        if time_str:
+            response += f"   Время: {time_str}\n"
+        response += "\n"
+
+    formatted_total = format_amount(total)
+    response += f"💵 Итого за день: {formatted_total} сум"
+    return response
+
+def export_row(expense):
+    """Строка экспорта в том же виде, что и в Excel"""
+    if isinstance(expense.created_at, datetime):
+        date_str = expense.created_at.strftime("%Y-%m-%d")
+    else:
+        date_str = str(expense.created_at)[:10]  # Берем только дату
+    return [
+        expense.first_name,
+        float(expense.amount),
+        CATEGORIES.get(expense.category, expense.category),
+        expense.description,
+        expense.comment or "",
+        date_str
+    ]
+
+def write_expenses_csv(expenses, stream: TextIO):
+    """Пишет расходы в CSV с теми же столбцами, что и Excel-отчет"""
+    writer = csv.writer(stream)
+    writer.writerow(EXPORT_HEADERS)
+    writer.writerows(export_row(expense) for expense in expenses)
@@ -0,0 +1,29 @@
+import logging
+import time
+from typing import List, Tuple
+
+# Целевое время готовности бота после запуска процесса
+STARTUP_BUDGET_MS = 1000
+
+class StartupTimer:
+    """Замеряет этапы запуска и выводит отчет о времени старта"""
+
+    def __init__(self, started_at: float = None):
+        self.started_at = started_at or time.perf_counter()
+        self._last = self.started_at
+        self.phases: List[Tuple[str, float]] = []
+
+    def mark(self, phase: str):
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self._last) * 1000))
+        self._last = now
+
+    @property
+    def total_ms(self) -> float:
+        return (self._last - self.started_at) * 1000
+
+    def report(self):
+        details = ", ".join(f"{phase} {elapsed:.0f} ms" for phase, elapsed in self.phases)
+        logging.info(f"Startup: {details}; total {self.total_ms:.0f} ms")
+        if self.total_ms > STARTUP_BUDGET_MS:
+            logging.warning(f"Startup took {self.total_ms:.0f} ms, budget is {STARTUP_BUDGET_MS} ms")
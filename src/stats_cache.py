@@ -0,0 +1,85 @@
+from collections import OrderedDict
+from datetime import date
+from typing import List, Optional, Tuple
+
+from aiogram.types import InlineQueryResultArticle, InputTextMessageContent
+
+from database import db
+from config import CATEGORIES
+from models import CategoryTotal
+from reports import format_category_totals
+
+# Период: (загрузчик, заголовок, подпись итога, название для списка результатов)
+PERIODS = {
+    'week': (db.get_user_expenses_by_category_weekly, "📊 Расходы за текущую неделю:", "Итого за неделю", "За неделю"),
+    'month': (db.get_user_expenses_by_category_monthly, "🗓 Расходы за текущий месяц:", "Итого за месяц", "За месяц"),
+    'all': (db.get_user_expenses_by_category_all_time, "💾 Расходы за всё время:", "Общий итог", "За всё время"),
+}
+
+PERIOD_ALIASES = {
+    'week': 'week', 'неделя': 'week', 'w': 'week',
+    'month': 'month', 'месяц': 'month', 'm': 'month',
+    'all': 'all', 'всё': 'all', 'все': 'all', 'a': 'all',
+}
+
+MAX_CACHED_ENTRIES = 1024
+
+# (telegram_id, период) -> (версия данных, дата, суммы по категориям)
+_totals: "OrderedDict[Tuple[int, str], Tuple[int, date, List[CategoryTotal]]]" = OrderedDict()
+# (telegram_id, период, категория) -> (версия данных, дата, готовая статья для inline-ответа)
+_articles: "OrderedDict[Tuple[int, str, Optional[str]], Tuple[int, date, InlineQueryResultArticle]]" = OrderedDict()
+
+def _remember(cache: OrderedDict, key, value):
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > MAX_CACHED_ENTRIES:
+        cache.popitem(last=False)
+
+def get_category_totals(telegram_id: int, period: str) -> List[CategoryTotal]:
+    """Суммы по категориям за период; запрос к БД только после новых записей или смены дня"""
+    key = (telegram_id, period)
+    version = db.data_version(telegram_id)
+    today = date.today()
+    cached = _totals.get(key)
+    if cached and cached[0] == version and cached[1] == today:
+        _totals.move_to_end(key)
+        return cached[2]
+
+    loader = PERIODS[period][0]
+    totals = loader(telegram_id)
+    _remember(_totals, key, (version, today, totals))
+    return totals
+
+def get_article(telegram_id: int, period: str, category: str = None) -> InlineQueryResultArticle:
+    """Готовая статья для inline-режима по периоду и (необязательно) категории"""
+    key = (telegram_id, period, category)
+    version = db.data_version(telegram_id)
+    today = date.today()
+    cached = _articles.get(key)
+    if cached and cached[0] == version and cached[1] == today:
+        _articles.move_to_end(key)
+        return cached[2]
+
+    _, title, total_label, short_title = PERIODS[period]
+    totals = get_category_totals(telegram_id, period)
+    if category:
+        totals = [item for item in totals if item.category == category]
+        category_name = CATEGORIES.get(category, category)
+        title = f"{title[:-1]} — {category_name}:"
+        short_title = f"{short_title}: {category_name}"
+
+    if totals:
+        text = format_category_totals(title, totals, total_label)
+        description = text.splitlines()[-1].replace("💵 ", "")
+    else:
+        text = f"{title}\n\nНет расходов 📊"
+        description = "Нет расходов"
+
+    article = InlineQueryResultArticle(
+        id=f"{period}:{category or 'all'}",
+        title=short_title,
+        description=description,
+        input_message_content=InputTextMessageContent(message_text=text)
+    )
+    _remember(_articles, key, (version, today, article))
+    return article
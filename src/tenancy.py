@@ -0,0 +1,47 @@
+import secrets
+from typing import Dict, Optional
+
+from database import db
+from config import ALLOWED_USERS
+from models import Tenant
+
+class MembershipCache:
+    """Кэш принадлежности пользователей к группам: telegram_id -> tenant_id"""
+
+    def __init__(self):
+        self._tenants: Dict[int, Optional[int]] = {}
+
+    def tenant_of(self, telegram_id: int) -> Optional[int]:
+        if telegram_id not in self._tenants:
+            self._tenants[telegram_id] = db.get_user_tenant_id(telegram_id)
+        return self._tenants[telegram_id]
+
+    def join(self, telegram_id: int, tenant_id: int) -> bool:
+        if not db.set_user_tenant(telegram_id, tenant_id):
+            return False
+        self._tenants[telegram_id] = tenant_id
+        return True
+
+    def create_group(self, telegram_id: int, name: str) -> Optional[Tenant]:
+        tenant = db.create_tenant(name, secrets.token_hex(4))
+        if tenant is None or not self.join(telegram_id, tenant.id):
+            return None
+        return tenant
+
+    def join_by_invite(self, telegram_id: int, invite_code: str) -> Optional[Tenant]:
+        tenant = db.get_tenant(invite_code=invite_code)
+        if tenant is None or not self.join(telegram_id, tenant.id):
+            return None
+        return tenant
+
+    def bootstrap(self, telegram_id: int) -> Optional[int]:
+        """Пользователи из ALLOWED_USERS без группы попадают в группу по умолчанию"""
+        tenant_id = self.tenant_of(telegram_id)
+        if tenant_id is None and telegram_id in ALLOWED_USERS:
+            default_tenant_id = db.get_default_tenant_id()
+            if default_tenant_id is not None and self.join(telegram_id, default_tenant_id):
+                tenant_id = default_tenant_id
+        return tenant_id
+
+# Глобальный кэш участников групп
+membership = MembershipCache()